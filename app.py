@@ -1,19 +1,51 @@
 import os
 import sqlite3
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, timezone
 from flask import Flask, jsonify, request, render_template, g, Response, stream_with_context
 import json
+import gzip
+import struct
 import time
 import calendar
+import math
+import numpy as np
 import pandas as pd
 import logging
 import tempfile
 import traceback
 import random
+import hashlib
+import uuid
+import itertools
 import threading
-from typing import List, Tuple, Dict
+import multiprocessing as mp
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Callable, List, Tuple, Dict
+from pytrends.exceptions import TooManyRequestsError
 from pytrends.request import TrendReq
 
+from smart_dca import (
+    ga_pool_evaluate,
+    ga_pool_init,
+    simulate_smart_dca_arrays,
+    simulate_smart_dca_batch,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+try:
+    import brotli
+except ImportError:  # compression br facultative, gzip sinon
+    brotli = None
+
 # Bounds for the four optimisation parameters
 PARAM_BOUNDS: List[Tuple[int, int]] = [
     (0, 99),   # fg_threshold_high
@@ -21,7 +53,9 @@ PARAM_BOUNDS: List[Tuple[int, int]] = [
     (1,100),    # bag_bonus_pct
     (1, 1000),  # bag_bonus_max
 ]
-N_PARAMS = len(PARAM_BOUNDS)
+GA_PARAM_NAMES = (
+    "fg_threshold_high", "fg_threshold_low", "bag_bonus_pct", "bag_bonus_max",
+)
 
 # Détermination du dossier racine du projet
 # Sur Render, le code est placé dans `/opt/render/project/src` alors que
@@ -29,8 +63,8 @@ N_PARAMS = len(PARAM_BOUNDS)
 # répertoire contenant ce fichier fonctionne dans les deux cas.
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 
-CSV_FILE = os.path.join(APP_ROOT, "data.csv")
-DB_NAME = os.path.join(tempfile.gettempdir(), "btc.db")
+CSV_FILE = os.environ.get("BTC_CSV_FILE", os.path.join(APP_ROOT, "data.csv"))
+DB_NAME = os.environ.get("BTC_DB_NAME", os.path.join(tempfile.gettempdir(), "btc.db"))
 
 app = Flask(__name__)
 
@@ -65,55 +99,543 @@ def log_request_end(response):
     return response
 
 
-def init_db(force: bool = False):
-    """Create the SQLite database from the CSV file."""
+# Incrémenté à chaque reconstruction de la base : sert à invalider les caches
+# dérivés des données (fitness du GA, ...).
+DATA_VERSION = 0
+
+
+class PriceStore:
+    """
+    Instantané colonnaire et immuable de la table ``data``.
+
+    ``dates`` (chaînes ISO), ``ordinals`` (jours, ``date.toordinal()``),
+    ``prices`` et ``fgs`` sont des tableaux NumPy en lecture seule, triés
+    par date. Les endpoints y lisent directement au lieu d'interroger
+    SQLite ; :meth:`start_index` reproduit ``WHERE date >= ?`` par
+    recherche dichotomique. ``weekdays`` (lundi = 0), ``days`` (jour du
+    mois) et ``years`` sont calculés une fois au chargement. ``built_at``
+    (UTC) date la construction de la base, pour ``Last-Modified``, et
+    ``csv_sha1`` est l'empreinte du CSV dont elle est issue.
+    :meth:`aggregate` fournit les séries hebdomadaires et mensuelles.
+    """
+
+    __slots__ = (
+        'version', 'dates', 'ordinals', 'prices', 'fgs',
+        'weekdays', 'days', 'years', 'built_at', 'csv_sha1', '_aggregates',
+    )
+
+    def __init__(self, version, dates, prices, fgs, built_at=None, csv_sha1=None):
+        self.version = version
+        self.built_at = built_at
+        self.csv_sha1 = csv_sha1
+        self.dates = np.asarray(dates, dtype='U10')
+        days = self.dates.astype('datetime64[D]')
+        # 719163 == date(1970, 1, 1).toordinal()
+        self.ordinals = days.astype(np.int64) + 719163
+        self.weekdays = (self.ordinals + 6) % 7
+        self.days = (days - days.astype('datetime64[M]')).astype(np.int64) + 1
+        self.years = days.astype('datetime64[Y]').astype(np.int64) + 1970
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.fgs = np.asarray(fgs, dtype=np.int64)
+        for arr in (self.dates, self.ordinals, self.prices, self.fgs,
+                    self.weekdays, self.days, self.years):
+            arr.flags.writeable = False
+        self._aggregates = {}
+
+    @classmethod
+    def load(cls, version: int) -> "PriceStore":
+        conn = _connect_readonly(DB_NAME)
+        try:
+            rows = conn.execute('SELECT date, price, fg FROM data ORDER BY date').fetchall()
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.OperationalError:  # base sans table meta
+            meta = {}
+        finally:
+            conn.close()
+        dates, prices, fgs = zip(*rows) if rows else ((), (), ())
+        built_at = meta.get('built_at')
+        if built_at is not None:
+            # les anciennes bases stockaient une heure locale naïve
+            built_at = datetime.fromisoformat(built_at).astimezone(timezone.utc)
+        return cls(version, dates, prices, fgs, built_at, meta.get('csv_sha1'))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def start_index(self, start) -> int:
+        """Premier indice avec ``date >= start`` (``None`` : aucune ligne)."""
+        if start is None:
+            return len(self)
+        return int(np.searchsorted(self.dates, start, side='left'))
+
+    def index_of(self, day) -> int | None:
+        i = self.start_index(day)
+        return i if i < len(self) and self.dates[i] == day else None
+
+    def aggregate(self, resolution: str) -> tuple[dict, np.ndarray]:
+        """
+        Agrégats OHLC du prix et du FGI par semaine (lundi–dimanche) ou par
+        mois civil, calculés une fois par instantané.
+
+        Renvoie ``(colonnes, ordinals)`` : chaque période est datée de sa
+        dernière séance, ``prices``/``fg`` en sont les clôtures, ``open``,
+        ``high``, ``low`` et ``fg_open``, ``fg_high``, ``fg_low`` le reste.
+        """
+        cached = self._aggregates.get(resolution)
+        if cached is not None:
+            return cached
+        if resolution == 'weekly':
+            keys = self.ordinals - self.weekdays
+        elif resolution == 'monthly':
+            keys = self.dates.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        else:
+            raise ValueError(f"unknown resolution {resolution!r}")
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1))
+        ends = np.flatnonzero(np.diff(keys, append=keys[-1:] + 1))
+        columns = {'dates': self.dates[ends], 'prices': self.prices[ends], 'fg': self.fgs[ends]}
+        for name, values in (('', self.prices), ('fg_', self.fgs)):
+            columns[name + 'open'] = values[starts]
+            if len(starts):
+                columns[name + 'high'] = np.maximum.reduceat(values, starts)
+                columns[name + 'low'] = np.minimum.reduceat(values, starts)
+            else:
+                columns[name + 'high'] = columns[name + 'low'] = values[:0]
+        ordinals = self.ordinals[ends]
+        for arr in (*columns.values(), ordinals):
+            arr.flags.writeable = False
+        self._aggregates[resolution] = (columns, ordinals)
+        return columns, ordinals
+
+
+_PRICE_STORE: PriceStore | None = None
+# (st_dev, st_ino) du fichier btc.db lu par _PRICE_STORE. Une reconstruction
+# publie un nouveau fichier : un autre inode signale qu'un autre worker (ou
+# /reset-db) a publié une nouvelle base.
+_DB_IDENTITY: tuple[int, int] | None = None
+
+
+def _db_identity(path: str = DB_NAME) -> tuple[int, int] | None:
+    """Identité du fichier (lien symbolique suivi)."""
     try:
-        if force and os.path.exists(DB_NAME):
-            os.remove(DB_NAME)
-        if force or not os.path.exists(DB_NAME):
-            df = pd.read_csv(CSV_FILE)
-            logging.info("Lecture de data.csv OK, lignes : %d", len(df))
-            df['Date'] = pd.to_datetime(df['Date'], format='%d.%m.%Y')
-            df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
-            df['Price'] = df['Price'].str.replace(',', '.').astype(float)
-            df.rename(columns={'Fear and Greed': 'fg'}, inplace=True)
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute('''CREATE TABLE data
-                         (date TEXT PRIMARY KEY,
-                          price REAL,
-                          fg INTEGER)''')
-            c.execute('''CREATE TABLE trends
-                         (date TEXT PRIMARY KEY,
-                          score INTEGER)''')
-            for _, row in df.iterrows():
-                c.execute('INSERT INTO data VALUES (?,?,?)',
-                          (row['Date'], row['Price'], int(row['fg'])))
-            conn.commit()
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def get_price_store() -> PriceStore:
+    """Instantané courant, rechargé si la base a été reconstruite."""
+    global _PRICE_STORE, _DB_IDENTITY, DATA_VERSION
+    store = _PRICE_STORE
+    identity = _db_identity()
+    if store is not None and identity != _DB_IDENTITY:
+        DATA_VERSION += 1
+    if store is None or store.version != DATA_VERSION:
+        store = _PRICE_STORE = PriceStore.load(DATA_VERSION)
+        _DB_IDENTITY = identity
+    return store
+
+
+def _connect_readonly(path: str) -> sqlite3.Connection:
+    return sqlite3.connect(Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+
+
+# Connexions SQLite réutilisées par thread (btc.db et btc_jobs.db) : une
+# connexion garde son cache de requêtes préparées et son mmap d'un appel à
+# l'autre au lieu de tout rouvrir à chaque requête HTTP.
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+SQLITE_CACHED_STATEMENTS = 256
+SQLITE_TIMEOUT = 10.0
+_DB_POOL = threading.local()
+
+
+def _open_connection(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        path, timeout=SQLITE_TIMEOUT, cached_statements=SQLITE_CACHED_STATEMENTS
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    return conn
+
+
+@contextmanager
+def db_connection(path: str | None = None):
+    """
+    Connexion du thread courant vers ``path`` (``DB_NAME`` par défaut).
+
+    Commit en sortie normale, rollback si une exception traverse le bloc :
+    la connexion retourne toujours propre dans le pool. Elle est rouverte
+    si le fichier a été remplacé (reconstruction de la base) ou après un
+    fork. Ne pas imbriquer deux blocs sur le même fichier : ils partagent
+    la même transaction.
+    """
+    path = path or DB_NAME
+    conns = getattr(_DB_POOL, 'conns', None)
+    if conns is None:
+        conns = _DB_POOL.conns = {}
+    # identité lue avant l'ouverture : si le fichier change entre les deux,
+    # la connexion sera simplement rouverte au prochain appel
+    key = (os.getpid(), _db_identity(path))
+    entry = conns.get(path)
+    if entry is None or entry[0] != key:
+        if entry is not None and entry[0][0] == key[0]:
+            entry[1].close()
+        entry = conns[path] = (key, _open_connection(path))
+    conn = entry[1]
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+def csv_digest(path: str = CSV_FILE) -> str:
+    """SHA-1 du fichier CSV : clé de la base construite à partir de lui."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _db_digest(path: str) -> str | None:
+    """Empreinte du CSV enregistrée dans la base (``None`` si absente)."""
+    if not os.path.exists(path):
+        return None
+    try:
+        conn = _connect_readonly(path)
+        try:
+            row = conn.execute(
+                "SELECT value FROM meta WHERE key = 'csv_sha1'"
+            ).fetchone()
+        finally:
             conn.close()
-            logging.info("Création de btc.db terminée")
+    except sqlite3.Error:
+        return None
+    return row[0] if row else None
+
+
+@contextmanager
+def _file_lock(path: str, timeout: float | None = None):
+    """
+    Verrou exclusif entre processus (et entre threads : un fd par appel).
+
+    Avec ``timeout``, renonce au bout de ``timeout`` secondes : la valeur
+    produite par le ``with`` indique si le verrou est tenu.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(path, 'a') as fh:
+        if timeout is None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
         else:
-            logging.info("btc.db déjà présent")
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        yield False
+                        return
+                    time.sleep(0.05)
+        try:
+            yield True
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def _db_build_lock():
+    """Verrou pendant la vérification/construction de la base."""
+    return _file_lock(DB_NAME + '.lock')
+
+
+# Plages déjà téléchargées, partagées par tous les workers via btc.db (voir
+# ensure_trends_fetched)
+TREND_FETCHES_SCHEMA = '''CREATE TABLE IF NOT EXISTS trend_fetches
+                          (start_date TEXT,
+                           end_date TEXT,
+                           rows INTEGER,
+                           fetched_at REAL)'''
+
+
+def _build_db(digest: str) -> tuple[int, float, float]:
+    """
+    Construit la base dans un nouveau fichier ``btc.db.<sha1>.<id>`` puis la
+    publie en remplaçant atomiquement le lien symbolique ``DB_NAME`` : les
+    lecteurs voient l'ancienne ou la nouvelle base, jamais un fichier
+    partiel. Chaque construction ayant son propre nom, ses fichiers WAL
+    (``-wal``/``-shm``, nommés d'après la cible du lien) ne se mélangent
+    jamais avec ceux d'une base encore ouverte ailleurs. Les scores Trends
+    déjà stockés sont repris.
+    Renvoie (lignes, durée lecture CSV, durée insertion).
+    """
+    t0 = time.perf_counter()
+    df = pd.read_csv(
+        CSV_FILE,
+        usecols=['Date', 'Price', 'Fear and Greed'],
+        decimal=',',
+        dtype={'Price': float, 'Fear and Greed': int},
+    )
+    logging.info("Lecture de data.csv OK, lignes : %d", len(df))
+    dates = pd.to_datetime(df['Date'], format='%d.%m.%Y').dt.strftime('%Y-%m-%d')
+    t_parse = time.perf_counter()
+
+    target = f"{DB_NAME}.{digest[:12]}.{uuid.uuid4().hex[:8]}"
+    link = f"{DB_NAME}.{os.getpid()}.tmp"
+    previous = os.path.realpath(DB_NAME) if os.path.islink(DB_NAME) else None
+    try:
+        conn = sqlite3.connect(target)
+        # Fichier privé jusqu'à la publication : pas besoin de journal ni de
+        # fsync pendant le chargement.
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        with conn:  # une seule transaction
+            conn.execute('''CREATE TABLE data
+                            (date TEXT PRIMARY KEY,
+                             price REAL,
+                             fg INTEGER)''')
+            conn.execute('''CREATE TABLE trends
+                            (date TEXT PRIMARY KEY,
+                             score INTEGER)''')
+            conn.execute(TREND_FETCHES_SCHEMA)
+            conn.execute('''CREATE TABLE meta
+                            (key TEXT PRIMARY KEY,
+                             value TEXT)''')
+            conn.executemany(
+                'INSERT INTO data VALUES (?,?,?)',
+                zip(dates.tolist(), df['Price'].tolist(), df['Fear and Greed'].tolist()),
+            )
+            conn.executemany(
+                'INSERT INTO meta VALUES (?,?)',
+                [('csv_sha1', digest),
+                 ('built_at', datetime.now(timezone.utc).isoformat())],
+            )
+        # Verrou des tendances jusqu'à la publication : un score téléchargé
+        # pendant la copie irait dans l'ancienne base et serait perdu.
+        with _file_lock(DB_NAME + '.trends.lock'):
+            if os.path.exists(DB_NAME):
+                conn.execute('ATTACH DATABASE ? AS old', (DB_NAME,))
+                for copy in (
+                    'INSERT OR IGNORE INTO trends SELECT date, score FROM old.trends',
+                    'INSERT INTO trend_fetches SELECT * FROM old.trend_fetches',
+                ):
+                    try:
+                        with conn:
+                            conn.execute(copy)
+                    except sqlite3.Error as e:
+                        logging.warning("Tendances de l'ancienne base non reprises : %s", e)
+                conn.execute('DETACH DATABASE old')
+            # WAL (persistant dans le fichier) : les lectures ne bloquent plus
+            # pendant les écritures de tendances.
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.close()
+            try:
+                if os.path.lexists(link):
+                    os.remove(link)
+                os.symlink(os.path.basename(target), link)
+                os.replace(link, DB_NAME)
+            except (OSError, NotImplementedError):
+                # pas de liens symboliques (Windows sans privilège) : renommage
+                os.replace(target, DB_NAME)
+    except BaseException:
+        for path in (target, link):
+            if os.path.lexists(path):
+                os.remove(path)
+        raise
+    if previous and previous != os.path.realpath(DB_NAME) and os.path.exists(previous):
+        # les connexions encore ouvertes dessus restent valides jusqu'à
+        # leur fermeture (fichiers seulement déliés)
+        for path in (previous, previous + '-wal', previous + '-shm'):
+            if os.path.exists(path):
+                os.remove(path)
+    return len(df), t_parse - t0, time.perf_counter() - t_parse
+
+
+def init_db(force: bool = False):
+    """
+    Prépare la base SQLite partagée à partir du CSV.
+
+    La base est identifiée par le SHA-1 de ``data.csv`` : si elle existe déjà
+    pour ce fichier (construite par le master gunicorn avec ``--preload`` ou
+    par le premier worker), elle est simplement ouverte en lecture ; sinon
+    elle est reconstruite une seule fois sous verrou puis publiée
+    atomiquement. ``force`` reconstruit dans tous les cas (/reset-db).
+    """
+    global DATA_VERSION, _PRICE_STORE, _DB_IDENTITY
+    try:
+        t0 = time.perf_counter()
+        digest = csv_digest()
+        with _db_build_lock():
+            built = force or _db_digest(DB_NAME) != digest
+            if built:
+                rows, t_csv, t_insert = _build_db(digest)
+            t_load = time.perf_counter()
+            identity = _db_identity()
+            # Nouveau snapshot construit avant d'être publié : les requêtes
+            # en cours gardent l'ancien, les suivantes voient le nouveau.
+            store = PriceStore.load(DATA_VERSION + 1)
+        DATA_VERSION += 1
+        _PRICE_STORE = store
+        _DB_IDENTITY = identity
+        t_end = time.perf_counter()
+        if built:
+            logging.info(
+                "Création de btc.db terminée : %d lignes en %.3fs "
+                "(CSV %.3fs, insertion %.3fs, snapshot %.3fs)",
+                rows, t_end - t0, t_csv, t_insert, t_end - t_load,
+            )
+        else:
+            logging.info(
+                "btc.db déjà construite pour data.csv %s : %d lignes "
+                "chargées en %.3fs (snapshot %.3fs)",
+                digest[:12], len(store), t_end - t0, t_end - t_load,
+            )
     except Exception as e:
         logging.error("❌ Erreur dans init_db : %s", e)
         raise
 
-init_db(force=True)
+# Lancé par `python app.py`, ce script est ré-exécuté sous le nom
+# __mp_main__ dans chaque worker du pool du GA : l'initialisation (base,
+# jobs, thread Trends) n'y a pas lieu d'être.
+_MP_WORKER = __name__ == '__mp_main__'
 
-# Cache pour les tendances Google Trends
-TREND_CACHE: dict[str, tuple[float, dict]] = {}
-TREND_TTL = 6 * 3600  # 6 heures
+# Avec `gunicorn --preload`, ce module est importé une fois par le master :
+# la base et le snapshot sont construits avant le fork et hérités par les
+# workers. Sans --preload, le premier worker construit, les autres attendent
+# le verrou puis réutilisent la base.
+if not _MP_WORKER:
+    init_db()
 
 @app.route('/api/genetic-optimize-smart-dca', methods=['POST'])
 def genetic_optimize_smart_dca():
     data = request.get_json()
-    amount = float(data.get('amount', 100))
     start = data.get('start', '2018-01-01')
     frequency = data.get('frequency', 'monthly')
-    res = genetic_algorithm(amount, start, frequency)
-    return jsonify({
-        "best": res
-    })
+    seed = data.get('random_seed')
+    try:
+        amount = float(data.get('amount', 100))
+        random_seed = _int_param(seed, 'random_seed') if seed is not None else None
+        workers = _workers_param(data.get('workers', 1))
+        persist_cache = _bool_param(data.get('persist_cache', False))
+    except (TypeError, ValueError) as exc:
+        return jsonify({'error': str(exc)}), 400
+    best, stats = genetic_algorithm(
+        amount, start, frequency,
+        random_seed=random_seed,
+        workers=workers,
+        persist_cache=persist_cache,
+    )
+    return jsonify({"best": best, **stats})
+
+
+class LRUCache:
+    """Petit cache LRU borné avec compteurs de hits/misses."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self)}
+
+
+# Caches de fitness conservés entre requêtes, par
+# (start, frequency, amount, DATA_VERSION) ; les plus anciens sont évincés.
+GA_CACHE_RUNS = 8
+_GA_CACHES: "OrderedDict[tuple, LRUCache]" = OrderedDict()
+_GA_CACHES_LOCK = threading.Lock()
+
+
+def _shared_fitness_cache(key: tuple, maxsize: int) -> LRUCache:
+    with _GA_CACHES_LOCK:
+        cache = _GA_CACHES.get(key)
+        if cache is None:
+            cache = _GA_CACHES[key] = LRUCache(maxsize)
+        _GA_CACHES.move_to_end(key)
+        while len(_GA_CACHES) > GA_CACHE_RUNS:
+            _GA_CACHES.popitem(last=False)
+        cache.maxsize = maxsize
+        return cache
+
+
+
+@contextmanager
+def _ga_worker_pool(prices, fgs, last_price, amount, workers):
+    """
+    Pool de processus pour l'évaluation du GA, ou ``None`` si ``workers <= 1``.
+
+    Les tableaux sont copiés une seule fois dans un segment de mémoire
+    partagée ; chaque génération n'envoie ensuite que les chromosomes.
+    Produit une fonction ``evaluate(pop) -> List[float]``.
+    """
+    if workers <= 1:
+        yield None
+        return
+
+    n = len(prices)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 2 * n * 8))
+    try:
+        data = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+        data[0] = prices
+        data[1] = fgs
+        del data  # sinon shm.close() échoue (buffer encore exporté)
+        # Pas de fork : le serveur Flask et les jobs tournent dans des
+        # threads, un fork pourrait hériter d'un verrou pris. Les workers
+        # n'exécutent que smart_dca (sans effet de bord à l'import), que le
+        # serveur forkserver précharge. Seul le script principal y est
+        # ré-exécuté (cf. _MP_WORKER pour `python app.py`).
+        if 'forkserver' in mp.get_all_start_methods():
+            ctx = mp.get_context('forkserver')
+            ctx.set_forkserver_preload(['smart_dca'])
+        else:
+            ctx = mp.get_context()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=ctx,
+            initializer=ga_pool_init,
+            initargs=(shm.name, n, last_price, amount),
+        ) as pool:
+            def evaluate(pop):
+                chunks = np.array_split(np.asarray(pop), workers)
+                parts = pool.map(ga_pool_evaluate, [c for c in chunks if len(c)])
+                return np.concatenate(list(parts)).tolist()
+
+            yield evaluate
+    finally:
+        shm.close()
+        shm.unlink()
 
 
 def simulate_dca_smart(params, amount, start, frequency):
@@ -130,18 +652,14 @@ def simulate_dca_smart(params, amount, start, frequency):
         # Par sécurité : on considère hebdo par défaut
         step = 7
 
-    # Récupère les données à partir de la date de départ
-    conn = get_db_connection()
-    rows = conn.execute(
-        'SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date',
-        (start,)
-    ).fetchall()
-    conn.close()
+    # Données à partir de la date de départ, depuis le store en mémoire
+    prices, fgs, last_price = store_smart_dca_arrays(start, step)
 
     # Appel de votre simulateur déjà existant
-    res = simulate_smart_dca_rows(
-        rows,
-        step,
+    res = simulate_smart_dca_arrays(
+        prices,
+        fgs,
+        last_price,
         amount,
         fg_high,
         fg_low,
@@ -166,12 +684,22 @@ def genetic_algorithm(
     immigrant_rate: float = 0.12,
     stagnation_patience: int = 30,
     random_seed: int | None = None,
-) -> Dict[str, float]:
+    workers: int = 1,
+    cache_size: int = 50_000,
+    persist_cache: bool = False,
+    progress: Callable[[dict], None] | None = None,
+) -> Tuple[Dict[str, float], Dict[str, dict]]:
     """Optimise smart‑DCA parameters with an enhanced genetic algorithm.
 
+    Returns ``(best, stats)``: the best parameters with their full
+    simulation, and the run statistics ``{"cache", "feasibility"}``.
+
     Improvements vs. the baseline version
     -------------------------------------
-    • **Lazy fitness cache** to avoid recomputing identical individuals.
+    • **Lazy fitness cache**: bounded LRU (``cache_size`` chromosomes) so
+      elites and duplicate children are never re-simulated. With
+      ``persist_cache`` the cache is kept across calls for the same
+      ``(start, frequency, amount)`` and data version.
     • **Data pre‑loading** (single DB hit) speeds up evaluation dramatically.
     • **Adaptive mutation**: probability linearly anneals from *mut_prob_start*
       to *mut_prob_end* across generations.
@@ -179,6 +707,13 @@ def genetic_algorithm(
     • **Random immigrants** (``immigrant_rate``) refresh diversity each gen.
     • **Early stopping** if the global best does not improve for
       ``stagnation_patience`` consecutive generations.
+    • **Process pool** (``workers`` > 1): each generation is split across
+      worker processes that read prices/FGI from shared memory. Only the
+      fitness evaluation is distributed, so a given ``random_seed`` yields
+      the same result whatever the worker count.
+    • **Progress callback** invoked after every generation with
+      ``{"phase", "count", "total", "best"}``; it may raise
+      :class:`JobCancelled` to abort the run.
     All default hyper‑parameters were tuned empirically to outperform the
     incremental/grid search on real data while remaining reasonably fast.
     """
@@ -197,31 +732,48 @@ def genetic_algorithm(
 
     step = {"weekly": 7, "monthly": 30}.get(frequency, 7)
 
-    # Pull DB rows **once** and keep them in memory for the whole run
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date", (start,)
-    ).fetchall()
-    conn.close()
+    # Strided views of the in-memory price store, shared by the whole run
+    prices, fgs, last_price = store_smart_dca_arrays(start, step)
 
     # ------------------------------------------------------------------
     # Low‑level GA primitives
     # ------------------------------------------------------------------
+    # Genes 0 and 1 are the FGI thresholds; only ``low <= high`` is a
+    # coherent strategy, so every operator below keeps that invariant and
+    # no evaluation is wasted on the -9999 penalty.
     def random_individual() -> List[int]:
-        """Sample a chromosome uniformly within PARAM_BOUNDS."""
-        return [random.randint(a, b) for a, b in PARAM_BOUNDS]
+        """Sample a feasible chromosome within PARAM_BOUNDS (low <= high)."""
+        ind = [random.randint(a, b) for a, b in PARAM_BOUNDS]
+        if ind[0] < ind[1]:
+            ind[0], ind[1] = ind[1], ind[0]
+        return ind
 
     def uniform_crossover(p1: List[int], p2: List[int]) -> List[int]:
-        """Bit‑wise mix of two parents (50% chance per gene)."""
-        return [g1 if random.random() < 0.5 else g2 for g1, g2 in zip(p1, p2)]
+        """Bit‑wise mix of two parents (50% chance per gene).
+
+        If the thresholds inherited from different parents cross, they are
+        swapped back into order.
+        """
+        child = [g1 if random.random() < 0.5 else g2 for g1, g2 in zip(p1, p2)]
+        if child[0] < child[1]:
+            child[0], child[1] = child[1], child[0]
+        return child
 
     def mutate(ind: List[int], prob: float) -> List[int]:
-        """Gaussian‑like integer mutation within bounds."""
+        """Gaussian‑like integer mutation within bounds.
+
+        The high threshold is clamped to ``[low, b]`` and the low threshold
+        to ``[a, high]`` so a feasible parent yields a feasible child.
+        """
         child = ind[:]
         for i, (a, b) in enumerate(PARAM_BOUNDS):
             if random.random() < prob:
                 # Range‑aware jitter (±3 % of the domain, min 1)
                 span = max(1, int(0.03 * (b - a)))
+                if i == 0:
+                    a = max(a, child[1])
+                elif i == 1:
+                    b = min(b, child[0])
                 child[i] = max(a, min(b, child[i] + random.randint(-span, span)))
         return child
 
@@ -234,71 +786,107 @@ def genetic_algorithm(
     # ------------------------------------------------------------------
     # Fitness evaluation with memoisation
     # ------------------------------------------------------------------
-    fitness_cache: Dict[Tuple[int, int, int, int], float] = {}
-
-    def evaluate(ind: List[int]) -> float:
-        high, low, pct, bmax = ind
-        # Vérifications logiques : stratégie cohérente sinon pénalité sévère
-        if high < low or pct < 1 or pct > 100 or bmax < 1:
-            return -9999  # Solution absurde, score très bas
-        # Appel normal à la simulation
-        perf = simulate_smart_dca_rows(
-            rows, step, amount, high, low, pct / 100.0, bmax
-        )["performance_pct"]
-        return perf
+    if persist_cache:
+        fitness_cache = _shared_fitness_cache(
+            (start, frequency, amount, DATA_VERSION), cache_size
+        )
+    else:
+        fitness_cache = LRUCache(cache_size)
+    # Counted per run: a shared cache may serve concurrent runs
+    cache_stats = {"hits": 0, "misses": 0}
+    feasibility = {"evaluations": 0, "feasible": 0}
+
+    def evaluate_population(pop: List[List[int]]) -> List[float]:
+        """Score the population, simulating only the chromosomes not cached.
+
+        Cache misses (deduplicated) go through one batched simulation;
+        incoherent strategies (``high < low`` …) get the -9999 penalty
+        from the batch engine.
+        """
+        keys = [tuple(ind) for ind in pop]
+        feasibility["evaluations"] += len(keys)
+        feasibility["feasible"] += sum(1 for k in keys if k[0] >= k[1])
+        fits = [fitness_cache.get(k) for k in keys]
+        todo = list(dict.fromkeys(k for k, f in zip(keys, fits) if f is None))
+        # A miss is one simulation; duplicates of a miss are hits
+        cache_stats["misses"] += len(todo)
+        cache_stats["hits"] += len(keys) - len(todo)
+        if todo:
+            if pool_evaluate is not None:
+                scores = pool_evaluate(todo)
+            else:
+                scores = simulate_smart_dca_batch(
+                    prices, fgs, last_price, amount, todo
+                ).tolist()
+            fresh = dict(zip(todo, scores))
+            for k, f in fresh.items():
+                fitness_cache.put(k, f)
+            fits = [fresh[k] if f is None else f for k, f in zip(keys, fits)]
+        return fits
 
 
     # ------------------------------------------------------------------
     # GA loop
     # ------------------------------------------------------------------
-    population = [random_individual() for _ in range(pop_size)]
-    best_params: List[int] | None = None
-    best_score = float("-inf")
-    stalled = 0
-
-    for gen in range(n_gen):
-        mut_prob = mut_prob_start + (mut_prob_end - mut_prob_start) * (gen / n_gen)
-        fitnesses = [evaluate(ind) for ind in population]
-
-        # Track global best
-        gen_best_idx = max(range(pop_size), key=lambda i: fitnesses[i])
-        gen_best_score = fitnesses[gen_best_idx]
-        if gen_best_score > best_score:
-            best_score = gen_best_score
-            best_params = population[gen_best_idx][:]
-            stalled = 0
-        else:
-            stalled += 1
+    with _ga_worker_pool(prices, fgs, last_price, amount, workers) as pool_evaluate:
+        population = [random_individual() for _ in range(pop_size)]
+        best_params: List[int] | None = None
+        best_score = float("-inf")
+        stalled = 0
+
+        for gen in range(n_gen):
+            mut_prob = mut_prob_start + (mut_prob_end - mut_prob_start) * (gen / n_gen)
+            fitnesses = evaluate_population(population)
+
+            # Track global best
+            gen_best_idx = max(range(pop_size), key=lambda i: fitnesses[i])
+            gen_best_score = fitnesses[gen_best_idx]
+            if gen_best_score > best_score:
+                best_score = gen_best_score
+                best_params = population[gen_best_idx][:]
+                stalled = 0
+            else:
+                stalled += 1
+            if progress is not None:
+                progress({
+                    "phase": "generation",
+                    "count": gen + 1,
+                    "total": n_gen,
+                    "best": dict(
+                        zip(GA_PARAM_NAMES, best_params),
+                        performance_pct=best_score,
+                    ),
+                })
             if stalled >= stagnation_patience:
                 break  # Early stopping – no progress for a while
 
-        # Elitism retains the top performers unmodified
-        elite_indices = sorted(range(pop_size), key=lambda i: fitnesses[i], reverse=True)[:elite_size]
-        next_pop: List[List[int]] = [population[i][:] for i in elite_indices]
+            # Elitism retains the top performers unmodified
+            elite_indices = sorted(range(pop_size), key=lambda i: fitnesses[i], reverse=True)[:elite_size]
+            next_pop: List[List[int]] = [population[i][:] for i in elite_indices]
 
-        # Fill the rest with offspring
-        target_size = int(pop_size * (1 - immigrant_rate))
-        while len(next_pop) < target_size:
-            p1 = tournament_select(population, fitnesses)
-            p2 = tournament_select(population, fitnesses)
-            child = uniform_crossover(p1, p2)
-            child = mutate(child, mut_prob)
-            next_pop.append(child)
+            # Fill the rest with offspring
+            target_size = int(pop_size * (1 - immigrant_rate))
+            while len(next_pop) < target_size:
+                p1 = tournament_select(population, fitnesses)
+                p2 = tournament_select(population, fitnesses)
+                child = uniform_crossover(p1, p2)
+                child = mutate(child, mut_prob)
+                next_pop.append(child)
 
-        # Inject fresh random individuals to fight premature convergence
-        while len(next_pop) < pop_size:
-            next_pop.append(random_individual())
+            # Inject fresh random individuals to fight premature convergence
+            while len(next_pop) < pop_size:
+                next_pop.append(random_individual())
 
-        population = next_pop
+            population = next_pop
 
     high, low, pct, bmax = best_params or random_individual()
     
     # Recalcule la simulation complète avec les meilleurs paramètres
-    res = simulate_smart_dca_rows(
-        rows, step, amount, high, low, pct / 100.0, bmax
+    res = simulate_smart_dca_arrays(
+        prices, fgs, last_price, amount, high, low, pct / 100.0, bmax
     )
 
-    return {
+    best = {
         "fg_threshold_high": high,
         "fg_threshold_low": low,
         "bag_bonus_pct": pct,
@@ -310,6 +898,17 @@ def genetic_algorithm(
         "bag_used": res["bag_used"],
         "bag_remaining": res["bag_remaining"],
     }
+    stats = {
+        "cache": {**cache_stats, "size": len(fitness_cache)},
+        "feasibility": {
+            **feasibility,
+            "feasible_share": (
+                feasibility["feasible"] / feasibility["evaluations"]
+                if feasibility["evaluations"] else 1.0
+            ),
+        },
+    }
+    return best, stats
 
     
     # return {
@@ -321,40 +920,48 @@ def genetic_algorithm(
     # }
 
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 def get_date_range():
     try:
-        conn = get_db_connection()
-        row = conn.execute('SELECT MIN(date) as min_date, MAX(date) as max_date FROM data').fetchone()
-        conn.close()
-        return row['min_date'], row['max_date']
+        store = get_price_store()
+        if not len(store):
+            return None, None
+        return str(store.dates[0]), str(store.dates[-1])
     except Exception as e:
         logging.error("Erreur dans get_date_range: %s", e)
         raise
 
 
+# --- Tendances Google Trends ---------------------------------------------
+TREND_TTL = 6 * 3600  # 6 heures
+TREND_CACHE_SIZE = 16
+TREND_PERIOD_DAYS = {"week": 7, "month": 30, "year": 365}
+TREND_ALL_START = date(2018, 1, 1)
+TREND_OVERLAP_DAYS = 30  # jours communs servant à raccorder deux requêtes
+# Un remplissage est découpé en tranches de TREND_BACKFILL_CHUNK_DAYS, le
+# verrou des tendances n'étant tenu que le temps d'une tranche ; les
+# requêtes HTTP n'attendent pas ce verrou plus de TREND_LOCK_TIMEOUT
+# secondes et servent sinon ce qui est déjà en base.
+TREND_BACKFILL_CHUNK_DAYS = 365
+TREND_LOCK_TIMEOUT = 2.0
+# Sur Render, les accès réseau vers Google Trends sont bloqués : on se
+# contente de ce qui est stocké dans la base.
+TRENDS_ALLOW_FETCH = not os.getenv("RENDER")
+
+
+def trend_period_start(period: str, today: date) -> date:
+    days = TREND_PERIOD_DAYS.get(period)
+    return today - timedelta(days=days) if days else TREND_ALL_START
+
+
 def get_trends_from_db(period: str) -> pd.DataFrame:
     """Return trend scores from the DB for the given period."""
     today = date.today()
-    if period == "week":
-        start = today - timedelta(days=7)
-    elif period == "month":
-        start = today - timedelta(days=30)
-    elif period == "year":
-        start = today - timedelta(days=365)
-    else:
-        start = date(2018, 1, 1)
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT date, score FROM trends WHERE date >= ? AND date <= ? ORDER BY date",
-        (start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")),
-    ).fetchall()
-    conn.close()
+    start = trend_period_start(period, today)
+    with db_connection() as conn:
+        rows = conn.execute(
+            "SELECT date, score FROM trends WHERE date >= ? AND date <= ? ORDER BY date",
+            (start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d")),
+        ).fetchall()
     if not rows:
         return pd.DataFrame(columns=["bitcoin"])
     idx = [datetime.strptime(r["date"], "%Y-%m-%d").date() for r in rows]
@@ -363,18 +970,132 @@ def get_trends_from_db(period: str) -> pd.DataFrame:
 
 def save_trends_to_db(df: pd.DataFrame) -> None:
     """Insert trend scores into the DB."""
-    conn = get_db_connection()
-    cur = conn.cursor()
-    for d, v in df["bitcoin"].items():
-        cur.execute(
+    with db_connection() as conn:
+        conn.executemany(
             "INSERT OR REPLACE INTO trends (date, score) VALUES (?, ?)",
-            (d.strftime("%Y-%m-%d"), int(round(v))),
+            [(d.strftime("%Y-%m-%d"), int(round(v))) for d, v in df["bitcoin"].items()],
         )
-    conn.commit()
-    conn.close()
 
 
-def fetch_trend_series(start: date, end: date) -> pd.DataFrame:
+class TrendsRateLimited(Exception):
+    """Réponse HTTP 429 de la source de tendances."""
+
+
+class TrendsBackend(ABC):
+    """
+    Source de scores Google Trends pour une fenêtre (une requête).
+
+    ``interest_over_time`` renvoie un DataFrame indexé par jour avec une
+    colonne ``bitcoin`` (normalisée 0–100 sur la fenêtre, comme Google) et
+    éventuellement ``isPartial`` (jour pas encore consolidé par Google) ;
+    ``sleep`` sert aux pauses et au backoff de ``fetch_trend_series``.
+    """
+
+    @abstractmethod
+    def interest_over_time(self, start: date, end: date) -> pd.DataFrame:
+        ...
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+
+class PytrendsBackend(TrendsBackend):
+    """Google Trends réel via pytrends."""
+
+    def __init__(self):
+        self._req = None
+
+    def interest_over_time(self, start: date, end: date) -> pd.DataFrame:
+        if self._req is None:
+            self._req = TrendReq(hl="fr-FR", tz=0, timeout=(10, 25))
+        try:
+            self._req.build_payload(["bitcoin"], timeframe=f"{start.isoformat()} {end.isoformat()}")
+            df = self._req.interest_over_time()
+        except TooManyRequestsError as exc:
+            raise TrendsRateLimited(str(exc)) from exc
+        return df
+
+
+class StubTrendsBackend(TrendsBackend):
+    """
+    Source hors ligne pour les tests et benchmarks.
+
+    Sert une série de référence (CSV ``date,score`` en ``fixture``, sinon
+    une marche aléatoire déterministe) normalisée 0–100 sur chaque fenêtre
+    comme le fait Google. Simule la latence réseau et des réponses 429
+    (probabilité ``error_rate``). Les attentes sont multipliées par
+    ``time_scale`` (0 : aucune) et totalisées dans ``slept``.
+    """
+
+    def __init__(self, fixture: str | None = None, latency: float = 0.0,
+                 error_rate: float = 0.0, time_scale: float = 1.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        if fixture:
+            ref = pd.read_csv(fixture, parse_dates=["date"]).set_index("date")["score"]
+        else:
+            days = pd.date_range(TREND_ALL_START - timedelta(days=365), date.today() + timedelta(days=1))
+            steps = np.random.default_rng(seed).normal(0, 0.03, len(days))
+            ref = pd.Series(np.exp(np.cumsum(steps)) * 10, index=days)
+        self.reference = ref.astype(float)
+        self.requests = 0
+        self.rate_limited = 0
+        self.slept = 0.0
+
+    def interest_over_time(self, start: date, end: date) -> pd.DataFrame:
+        self.requests += 1
+        self.sleep(self.latency)
+        if self.error_rate and self._rng.random() < self.error_rate:
+            self.rate_limited += 1
+            raise TrendsRateLimited("429 Too Many Requests (stub)")
+        # comme Google : rien au-delà d'hier, le dernier jour encore partiel
+        end = min(end, date.today() - timedelta(days=1))
+        window = self.reference[pd.Timestamp(start):pd.Timestamp(end)]
+        peak = window.max()
+        scores = (window / peak * 100).round() if peak else window
+        partial = np.zeros(len(scores), dtype=bool)
+        if len(partial) and scores.index[-1].date() >= date.today() - timedelta(days=1):
+            partial[-1] = True
+        return pd.DataFrame({"bitcoin": scores, "isPartial": partial})
+
+    def sleep(self, seconds: float) -> None:
+        self.slept += seconds
+        if seconds * self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+
+TREND_MAX_ATTEMPTS = 5
+TREND_WINDOW_PAUSE = 1.0  # secondes entre deux fenêtres
+_TRENDS_BACKEND: TrendsBackend | None = None
+
+
+def get_trends_backend() -> TrendsBackend:
+    """
+    Source configurée par ``TRENDS_BACKEND`` (``pytrends`` par défaut ou
+    ``stub`` ; options ``TRENDS_STUB_FIXTURE``, ``TRENDS_STUB_LATENCY``,
+    ``TRENDS_STUB_ERROR_RATE``), remplaçable par ``set_trends_backend``.
+    """
+    global _TRENDS_BACKEND
+    if _TRENDS_BACKEND is None:
+        if os.environ.get("TRENDS_BACKEND", "pytrends") == "stub":
+            _TRENDS_BACKEND = StubTrendsBackend(
+                fixture=os.environ.get("TRENDS_STUB_FIXTURE"),
+                latency=float(os.environ.get("TRENDS_STUB_LATENCY", 0)),
+                error_rate=float(os.environ.get("TRENDS_STUB_ERROR_RATE", 0)),
+            )
+        else:
+            _TRENDS_BACKEND = PytrendsBackend()
+    return _TRENDS_BACKEND
+
+
+def set_trends_backend(backend: TrendsBackend | None) -> None:
+    global _TRENDS_BACKEND
+    _TRENDS_BACKEND = backend
+
+
+def fetch_trend_series(start: date, end: date, backend: TrendsBackend | None = None) -> pd.DataFrame:
     """Récupère la série Google Trends journalière pour Bitcoin avec rescaling.
 
     Cette fonction effectue plusieurs appels à Google Trends sur des périodes
@@ -384,68 +1105,187 @@ def fetch_trend_series(start: date, end: date) -> pd.DataFrame:
     d'erreur ainsi qu'une pause entre chaque segment pour limiter la charge.
     """
 
-    kw = ["bitcoin"]
+    backend = backend or get_trends_backend()
     delta = timedelta(days=90)
-    overlap = 30
-    pt = TrendReq(hl="fr-FR", tz=0, timeout=(10, 25))
+    overlap = TREND_OVERLAP_DAYS
 
     cur_start = start
     all_df: pd.DataFrame | None = None
 
     while cur_start <= end:
         cur_end = min(cur_start + delta, end)
-        tf = f"{cur_start.strftime('%Y-%m-%d')} {cur_end.strftime('%Y-%m-%d')}"
 
         # Limite les erreurs 429 renvoyées par Google
-        for attempt in range(5):
+        for attempt in range(TREND_MAX_ATTEMPTS):
             try:
-                pt.build_payload(kw, timeframe=tf)
-                df = pt.interest_over_time().drop(columns=["isPartial"])
+                df = backend.interest_over_time(cur_start, cur_end)
                 break
             except Exception as exc:
-                # TooManyRequestsError et autres erreurs réseau
-                if attempt == 4:
+                # TrendsRateLimited et autres erreurs réseau
+                if attempt == TREND_MAX_ATTEMPTS - 1:
                     raise
-                time.sleep(2 ** attempt)
+                backend.sleep(2 ** attempt)
         else:  # pragma: no cover - sûréserviste
             raise RuntimeError("Unable to fetch Google Trends data")
 
-        if all_df is None:
+        if all_df is None or all_df.empty:
             all_df = df
         else:
-            overlap_prev = all_df.iloc[-overlap:]
-            overlap_new = df.iloc[:overlap]
-            if not overlap_new.empty and not overlap_prev.empty:
-                factor = (overlap_prev.mean()[0] / overlap_new.mean()[0]) or 1
+            # raccord sur les jours communs aux deux fenêtres
+            common = all_df.index.intersection(df.index)
+            if len(common) and df.loc[common, "bitcoin"].mean():
+                factor = (all_df.loc[common, "bitcoin"].mean() / df.loc[common, "bitcoin"].mean()) or 1
             else:
                 factor = 1
-            df = df * factor
-            df = df.iloc[overlap:]
+            df = df.assign(bitcoin=df["bitcoin"] * factor)
+            df = df[df.index > all_df.index[-1]]
             all_df = pd.concat([all_df, df])
 
+        if cur_end >= end:
+            break
         cur_start = cur_start + delta - timedelta(days=overlap)
-        time.sleep(1)  # évite d'enchaîner trop vite les requêtes
+        backend.sleep(TREND_WINDOW_PAUSE)  # évite d'enchaîner trop vite les requêtes
 
-    return all_df.loc[start:end]
+    if all_df is None:
+        return pd.DataFrame(columns=["bitcoin"])
+    all_df.index = pd.to_datetime(all_df.index).date
+    return all_df.loc[(all_df.index >= start) & (all_df.index <= end)]
 
 
 
-def get_trends_json(period: str, fetch_if_missing: bool = True) -> dict:
+def trend_gaps(start: date, end: date) -> list[tuple[date, date]]:
+    """
+    Plages de ``[start, end]`` à télécharger : jours sans score en base et
+    non couverts par un téléchargement déjà enregistré (Google ne renvoie
+    pas toujours le dernier jour ; inutile de le redemander sans cesse).
+    """
+    n = (end - start).days + 1
+    if n <= 0:
+        return []
+    covered = np.zeros(n, dtype=bool)
+    base = start.toordinal()
+    with db_connection() as conn:
+        days = conn.execute(
+            "SELECT date FROM trends WHERE date >= ? AND date <= ?",
+            (start.isoformat(), end.isoformat()),
+        ).fetchall()
+        try:
+            fetches = conn.execute(
+                "SELECT start_date, end_date FROM trend_fetches"
+                " WHERE end_date >= ? AND start_date <= ?",
+                (start.isoformat(), end.isoformat()),
+            ).fetchall()
+        except sqlite3.OperationalError:  # base antérieure à trend_fetches
+            fetches = []
+    if days:
+        covered[[date.fromisoformat(r["date"]).toordinal() - base for r in days]] = True
+    for f0, f1 in fetches:
+        lo = max(date.fromisoformat(f0).toordinal() - base, 0)
+        hi = min(date.fromisoformat(f1).toordinal() - base, n - 1)
+        covered[lo:hi + 1] = True
+    # débuts et fins des suites de jours manquants
+    edges = np.diff(np.concatenate(([0], (~covered).astype(np.int8), [0])))
+    return [
+        (date.fromordinal(base + int(lo)), date.fromordinal(base + int(hi) - 1))
+        for lo, hi in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1))
+    ]
+
+
+def record_trend_fetch(start: date, end: date, rows: int) -> None:
+    with db_connection() as conn:
+        conn.execute(TREND_FETCHES_SCHEMA)
+        conn.execute(
+            "INSERT INTO trend_fetches VALUES (?, ?, ?, ?)",
+            (start.isoformat(), end.isoformat(), rows, time.time()),
+        )
+
+
+def _stored_trends(start: date, end: date) -> pd.Series:
+    with db_connection() as conn:
+        rows = conn.execute(
+            "SELECT date, score FROM trends WHERE date >= ? AND date <= ?",
+            (start.isoformat(), end.isoformat()),
+        ).fetchall()
+    return pd.Series(
+        [r["score"] for r in rows],
+        index=[date.fromisoformat(r["date"]) for r in rows],
+        dtype=float,
+    )
+
+
+def backfill_trend_gap(gap_start: date, gap_end: date, today: date) -> int:
+    """
+    Télécharge une plage manquante élargie de ``TREND_OVERLAP_DAYS`` de
+    chaque côté, puis la remet à l'échelle des scores stockés (Google
+    normalise chaque requête sur 0–100) grâce aux jours communs. Renvoie le
+    nombre de jours enregistrés.
+
+    Les jours ``isPartial`` ne sont pas enregistrés, et la plage n'est
+    marquée couverte que jusqu'au dernier jour consolidé renvoyé (jamais
+    ``today``) : les jours que Google publie avec retard seront redemandés.
+    """
+    margin = timedelta(days=TREND_OVERLAP_DAYS)
+    fetched = fetch_trend_series(gap_start - margin, min(gap_end + margin, today))
+    if "isPartial" in fetched:
+        fetched = fetched[~fetched["isPartial"].astype(bool)]
+    stored = _stored_trends(gap_start - margin, gap_end + margin)
+    series = fetched["bitcoin"].astype(float)
+    common = stored.index.intersection(series.index)
+    if len(common) and series.loc[common].mean():
+        series = series * (stored.loc[common].mean() / series.loc[common].mean())
+    new = series[(series.index >= gap_start) & (series.index <= gap_end)]
+    if len(new):
+        save_trends_to_db(new.to_frame("bitcoin"))
+    covered_end = min(series.index.max(), gap_end, today - timedelta(days=1)) if len(series) else None
+    if covered_end is not None and covered_end >= gap_start:
+        record_trend_fetch(gap_start, covered_end, len(new))
+    return len(new)
+
+
+def ensure_trends_fetched(start: date, end: date, lock_timeout: float | None = None) -> bool:
+    """
+    Complète ``[start, end]`` en ne téléchargeant que les plages manquantes.
+
+    Le verrou fichier sérialise les téléchargements de tous les threads et
+    workers. Il est pris pour chaque tranche de TREND_BACKFILL_CHUNK_DAYS
+    d'une plage manquante, et les trous de la tranche sont recalculés une
+    fois le verrou obtenu, un autre worker ayant pu les combler entre-temps.
+    Si le verrou n'est pas obtenu en ``lock_timeout`` secondes, on s'arrête
+    là (les données en base sont servies telles quelles). Renvoie True si un
+    téléchargement a eu lieu.
+    """
+    chunk = timedelta(days=TREND_BACKFILL_CHUNK_DAYS)
+    fetched = False
+    for gap_start, gap_end in trend_gaps(start, end):
+        lo = gap_start
+        while lo <= gap_end:
+            hi = min(lo + chunk - timedelta(days=1), gap_end)
+            with _file_lock(DB_NAME + '.trends.lock', lock_timeout) as locked:
+                if not locked:
+                    logging.info("Tendances en cours de téléchargement ailleurs : données en base servies")
+                    return fetched
+                for sub_start, sub_end in trend_gaps(lo, hi):
+                    t0 = time.perf_counter()
+                    saved = backfill_trend_gap(sub_start, sub_end, end)
+                    fetched = True
+                    logging.info(
+                        "Tendances %s → %s complétées : %d jours en %.1fs",
+                        sub_start, sub_end, saved, time.perf_counter() - t0,
+                    )
+            lo = hi + timedelta(days=1)
+    return fetched
+
+
+def get_trends_json(period: str, allow_fetch: bool = True,
+                    lock_timeout: float | None = TREND_LOCK_TIMEOUT) -> dict:
     today = date.today()
-    if period == "week":
-        start = today - timedelta(days=7)
-    elif period == "month":
-        start = today - timedelta(days=30)
-    elif period == "year":
-        start = today - timedelta(days=365)
-    else:  # all
-        start = date(2018, 1, 1)
+    start = trend_period_start(period, today)
 
     df = get_trends_from_db(period)
     required_days = (today - start).days + 1
     if len(df) < required_days and allow_fetch:
-        fetched = fetch_trend_series(start, today)
-        save_trends_to_db(fetched)
+        # relu même sans téléchargement : un autre thread a pu s'en charger
+        ensure_trends_fetched(start, today, lock_timeout)
         df = get_trends_from_db(period)
     scores = [
         {"date": d.strftime("%Y-%m-%d"), "score": int(round(v))}
@@ -461,10 +1301,74 @@ def get_trends_json(period: str, fetch_if_missing: bool = True) -> dict:
     }
 
 
+class TrendsService:
+    """
+    Point d'entrée unique des tendances (/trends, /api/trend-data, thread de
+    démarrage).
+
+    Les réponses sont gardées ``ttl`` secondes dans un cache LRU borné. Les
+    appels concurrents pour une même période sont fusionnés (single-flight) :
+    un seul calcule, les autres attendent son résultat. Les téléchargements
+    eux-mêmes sont dédoublonnés entre workers par ``ensure_trends_fetched``.
+    """
+
+    def __init__(self, ttl: float, maxsize: int, allow_fetch: bool):
+        self.ttl = ttl
+        self.allow_fetch = allow_fetch
+        self._cache = LRUCache(maxsize)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, period: str) -> dict:
+        if period not in TREND_PERIOD_DAYS:
+            period = "all"
+        cached = self._cache.get(period)
+        if cached and time.time() - cached[0] < self.ttl:
+            return cached[1]
+        with self._lock:
+            flight = self._inflight.get(period)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[period] = Future()
+        if not leader:
+            return flight.result()
+        try:
+            data = self._compute(period)
+        except BaseException as exc:
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(data)
+            return data
+        finally:
+            with self._lock:
+                del self._inflight[period]
+
+    def _compute(self, period: str) -> dict:
+        fetched_before = self._fetch_count()
+        data = get_trends_json(period, allow_fetch=self.allow_fetch)
+        if self._fetch_count() != fetched_before:
+            # nouvelles données : les autres périodes en cache sont périmées
+            self._cache.clear()
+        self._cache.put(period, (time.time(), data))
+        return data
+
+    @staticmethod
+    def _fetch_count() -> int:
+        try:
+            with db_connection() as conn:
+                return conn.execute("SELECT COUNT(*) FROM trend_fetches").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+
+
+TRENDS = TrendsService(TREND_TTL, TREND_CACHE_SIZE, TRENDS_ALLOW_FETCH)
+
+
 def _fetch_trends_background(period: str = "month") -> None:
     """Tâche de fond pour enregistrer les tendances dès le démarrage."""
     try:
-        get_trends_json(period)
+        TRENDS.get(period)
         logging.info("Tendances %s enregistrées", period)
     except Exception as exc:
         # On logge l'erreur mais on ne remonte pas d'exception
@@ -473,9 +1377,51 @@ def _fetch_trends_background(period: str = "month") -> None:
 
 # Démarre la récupération des tendances en tâche de fond après init_db
 # Sur Render, les accès réseaux sont restreints : on désactive donc ce thread
-if not os.getenv("RENDER"):
+if TRENDS_ALLOW_FETCH and not _MP_WORKER:
     threading.Thread(target=_fetch_trends_background, daemon=True).start()
 
+def store_smart_dca_arrays(start, step):
+    """
+    Comme :func:`smart_dca_arrays` mais lu depuis le :class:`PriceStore`,
+    sans requête SQLite ni objet par ligne.
+    """
+    store = get_price_store()
+    i = store.start_index(start)
+    last_price = float(store.prices[-1]) if i < len(store) else 0
+    return store.prices[i::step], store.fgs[i::step], last_price
+
+
+def smart_dca_arrays(rows, step):
+    """
+    Pré-découpe les lignes en tableaux NumPy pour le moteur vectorisé.
+
+    Retourne ``(prices, fgs, last_price)`` où ``prices`` et ``fgs`` ne
+    contiennent que les jours d'achat (une ligne sur ``step``) et
+    ``last_price`` est le dernier prix connu, utilisé pour la valorisation.
+    """
+    last_price = rows[-1]['price'] if rows else 0
+    picked = rows[::step]
+    prices = np.fromiter((r['price'] for r in picked), dtype=np.float64, count=len(picked))
+    fgs = np.fromiter((r['fg'] for r in picked), dtype=np.float64, count=len(picked))
+    return prices, fgs, last_price
+
+
+
+def _top_two(perfs):
+    """
+    Indices du meilleur et du second meilleur score, avec le même
+    départage (première occurrence) que les boucles séquentielles.
+    """
+    if not len(perfs):
+        return None, None
+    best = int(np.argmax(perfs))
+    if len(perfs) == 1:
+        return best, None
+    rest = np.delete(perfs, best)
+    second = int(np.argmax(rest))
+    return best, second + (second >= best)
+
+
 def simulate_smart_dca_rows(rows, step, amount, high, low, pct, bonus_max):
     """
     Simulation d’un DCA « Fear & Greed ».
@@ -486,89 +1432,311 @@ def simulate_smart_dca_rows(rows, step, amount, high, low, pct, bonus_max):
     high / low : seuils FGI (haut = envoyer au bag, bas = utiliser le bag)
     pct        : fraction du bag (0–1) qu’on peut utiliser comme bonus
     bonus_max  : plafond absolu (USD) pour le bonus ponctionné dans le bag
+
+    Adaptateur autour de :func:`simulate_smart_dca_arrays` ; les boucles
+    d'optimisation doivent plutôt pré-calculer les tableaux une seule fois.
     """
+    prices, fgs, last_price = smart_dca_arrays(rows, step)
+    return simulate_smart_dca_arrays(
+        prices, fgs, last_price, amount, high, low, pct, bonus_max
+    )
 
-    # Stratégies incohérentes → score très bas
-    if high < low or not (0 < pct <= 1) or bonus_max < 1:
-        return {
-            'performance_pct': -9999,
-            'total_invested': 0,
-            'btc_total': 0,
-            'final_value': 0,
-            'bag_used': 0,
-            'bag_remaining': 0,
-        }
 
-    btc_total = invested = 0.0
-    bag = bag_used = 0.0
-    last_price = rows[-1]['price'] if rows else 0
-    max_bag = 12 * amount            # bag plafonné à 1 an de DCA
+# Réponses JSON dérivées uniquement des données : sérialisées une fois par
+# version des données, puis compressées une fois par encodage.
+_RESPONSE_CACHE = LRUCache(maxsize=64)
+COMPRESS_MIN_SIZE = 1024  # octets ; en dessous, la compression ne paie pas
 
-    for i, r in enumerate(rows):
-        if i % step != 0:
-            continue
 
-        fg = r['fg']
-        bonus = 0.0
-        invest_amount = amount       # mise « normale »
+def _response_encoding(size: int) -> str | None:
+    if size < COMPRESS_MIN_SIZE:
+        return None
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
 
-        if fg >= high:               # sentiment élevé → on réserve dans le bag
-            bag = min(bag + amount, max_bag)
-            invest_amount = 0.0
 
-        elif fg <= low:              # sentiment bas → on puise dans le bag
-            available_bonus = bag * pct
-            bonus = min(available_bonus, bonus_max, bag)
-            bag -= bonus
-            invest_amount = amount + bonus
+def _compress(raw: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(raw, quality=9)
+    return gzip.compress(raw, compresslevel=9, mtime=0)
 
-        # Achat réel de BTC
-        if invest_amount > 0:
-            btc_total += invest_amount / r['price']
-            invested += invest_amount
-            bag_used += bonus
-
-    # Valeur finale et performance
-    final_value = btc_total * last_price if rows else 0
-    total_engaged = invested + bag      # tout ce qui a été sorti du portefeuille
-    performance = (
-        (final_value + bag - total_engaged) / total_engaged * 100
-        if total_engaged else 0
+
+def cached_response(store: PriceStore, key: tuple, build: Callable[[], object],
+                    mimetype: str = 'application/json'):
+    """
+    Réponse mise en cache pour ``store.version`` et ``key``.
+
+    ``build`` n'est appelé qu'au premier accès et renvoie soit un objet
+    sérialisé en JSON, soit directement des ``bytes`` ; le corps est ensuite
+    servi tel quel (gzip/brotli selon ``Accept-Encoding``) avec un ``ETag``
+    tiré de son contenu, identique d'un worker à l'autre, et
+    ``Last-Modified`` ; un client à jour reçoit un 304 sans corps.
+    """
+    cache_key = (store.version, *key)
+    entry = _RESPONSE_CACHE.get(cache_key)
+    if entry is None:
+        raw = build()
+        if not isinstance(raw, bytes):
+            raw = json.dumps(raw, separators=(',', ':'), sort_keys=True).encode()
+        entry = {None: raw, 'etag': hashlib.sha1(raw).hexdigest()[:20]}
+        _RESPONSE_CACHE.put(cache_key, entry)
+    encoding = _response_encoding(len(entry[None]))
+    body = entry.get(encoding)
+    if body is None:
+        body = entry[encoding] = _compress(entry[None], encoding)
+
+    resp = Response(body, mimetype=mimetype)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.vary.add('Accept-Encoding')
+    resp.vary.add('Accept')
+    # un ETag fort par représentation (gzip, br, brute)
+    resp.set_etag(entry['etag'] + (f'-{encoding}' if encoding else ''))
+    if store.built_at is not None:
+        resp.last_modified = store.built_at
+    resp.cache_control.no_cache = True  # toujours revalider (304 au besoin)
+    return resp.make_conditional(request)
+
+
+# Formats des séries temporelles (/api/chart-data, /api/dca, /api/smart-dca),
+# choisis par le paramètre ``format`` ou, à défaut, par l'en-tête Accept :
+#   json      lignes d'objets (format historique)
+#   columnar  JSON, un tableau par champ
+#   binary    tampons little-endian float64 précédés d'un en-tête (binary32 :
+#             float32)
+SERIES_FORMATS = ('json', 'columnar', 'binary', 'binary32')
+# Résolutions de /api/chart-data : séances brutes ou agrégats de PriceStore.
+RESOLUTIONS = ('daily', 'weekly', 'monthly')
+COLUMNAR_MIMETYPE = 'application/vnd.btcboard.columnar+json'
+BINARY_MIMETYPE = 'application/vnd.btcboard.series'
+SERIES_MAGIC = b'BTCS'
+DATE_COLUMNS = ('date', 'dates')
+
+
+def series_format(value=None) -> str:
+    """Format demandé (``value`` puis Accept) ; ValueError si inconnu."""
+    if value:
+        if value not in SERIES_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(SERIES_FORMATS)}")
+        return value
+    best = request.accept_mimetypes.best_match(
+        ['application/json', COLUMNAR_MIMETYPE, BINARY_MIMETYPE],
+        default='application/json',
     )
+    return {COLUMNAR_MIMETYPE: 'columnar', BINARY_MIMETYPE: 'binary'}.get(best, 'json')
 
-    return {
-        'performance_pct': performance,
-        'total_invested': invested,
 
-        now = time.time()
-        cached = TREND_CACHE.get(period)
-        if cached and now - cached[0] < TREND_TTL:
-            return jsonify(cached[1])
+def rows_to_columns(rows: list, fields: tuple) -> dict:
+    """Lignes d'objets -> un tableau par champ."""
+    return {f: [r[f] for r in rows] for f in fields}
+
+
+def _binary_column(name: str, values, float_dtype: str) -> tuple[np.ndarray, dict]:
+    if name in DATE_COLUMNS:
+        # jours depuis le 1970-01-01 : ``new Date(d * 864e5)`` côté client
+        arr = np.asarray(values, dtype='datetime64[D]').astype('<i4')
+        return arr, {'dtype': '<i4', 'unit': 'days'}
+    arr = np.asarray(values)
+    if arr.dtype.kind == 'b':
+        return arr.astype('|u1'), {'dtype': '|u1'}
+    if arr.dtype.kind in 'iu':
+        return arr.astype('<i4'), {'dtype': '<i4'}
+    if arr.dtype.kind in 'US':
+        categories, codes = np.unique(arr, return_inverse=True)
+        dtype = '|u1' if len(categories) <= 256 else '<i4'
+        return codes.astype(dtype), {'dtype': dtype, 'categories': categories.tolist()}
+    return arr.astype(float_dtype), {'dtype': float_dtype}
+
+
+def encode_binary(tables: dict, meta: dict, float_dtype: str = '<f8') -> bytes:
+    """
+    Encode des tables de colonnes en un seul tampon :
+
+        b'BTCS' | longueur de l'en-tête (uint32 LE) | en-tête JSON | colonnes
+
+    L'en-tête décrit ``meta`` et, pour chaque table, sa longueur et ses
+    colonnes (nom, dtype NumPy, décalage depuis le début des colonnes,
+    catégories des colonnes texte). Colonnes et début des données sont
+    alignés sur 8 octets : le client peut poser un ``Float64Array``
+    directement sur le tampon reçu.
+    """
+    header = {'meta': meta, 'tables': {}}
+    buffers = []
+    offset = 0
+    for table, columns in tables.items():
+        described = []
+        length = 0
+        for name, values in columns.items():
+            arr, desc = _binary_column(name, values, float_dtype)
+            pad = -offset % 8
+            if pad:
+                buffers.append(b'\0' * pad)
+                offset += pad
+            described.append({'name': name, **desc, 'offset': offset})
+            buffers.append(arr.tobytes())
+            offset += arr.nbytes
+            length = len(arr)
+        header['tables'][table] = {'length': length, 'columns': described}
+    head = json.dumps(header, separators=(',', ':')).encode()
+    head += b' ' * (-(len(head) + 8) % 8)
+    return SERIES_MAGIC + struct.pack('<I', len(head)) + head + b''.join(buffers)
+
+
+def series_response(fmt: str, meta: dict, tables: dict, row_fields: dict):
+    """
+    Réponse d'un endpoint de séries : ``meta`` (résumé) plus des tables de
+    lignes ``tables`` (nom -> liste d'objets, champs dans ``row_fields``).
+    """
+    if fmt == 'json':
+        return jsonify({**meta, **tables})
+    columns = {
+        name: rows_to_columns(rows, row_fields[name]) for name, rows in tables.items()
+    }
+    if fmt == 'columnar':
+        resp = jsonify({**meta, **columns})
+        resp.mimetype = COLUMNAR_MIMETYPE
+        return resp
+    float_dtype = '<f4' if fmt == 'binary32' else '<f8'
+    return Response(encode_binary(columns, meta, float_dtype), mimetype=BINARY_MIMETYPE)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets : indices de ``n_out`` points qui
+    préservent au mieux la forme de la courbe (premier et dernier inclus).
+
+    Une itération Python par seau de sortie ; l'aire des triangles est
+    calculée en vectoriel sur tout le seau, d'où un coût O(n) en NumPy.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 seaux entre le premier et le dernier point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    # moyenne du seau suivant (le dernier point pour le dernier seau)
+    nxt_lo, nxt_hi = edges[1:], np.r_[edges[2:], n]
+    nxt_hi[-1], nxt_lo[-1] = n, n - 1
+    size = nxt_hi - nxt_lo
+    avg_x = (cx[nxt_hi] - cx[nxt_lo]) / size
+    avg_y = (cy[nxt_hi] - cy[nxt_lo]) / size
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs(
+            (ax - avg_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[i] - ay)
+        )
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample_indices(x, y, max_points: int | None, keep=None) -> np.ndarray:
+    """
+    Indices à conserver pour afficher ``y`` en au plus ~``max_points``
+    points : LTTB, plus le minimum et le maximum de la série et les indices
+    ``keep`` (marqueurs d'achat) tant qu'ils tiennent dans le budget, LTTB
+    complétant avec les points restants. ``max_points`` ``None`` : tous les
+    points.
+    """
+    n = len(y)
+    if max_points is None or max_points >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    forced = [np.argmax(y), np.argmin(y)]
+    if keep is not None and len(keep) + 2 < max_points:
+        forced.extend(keep)
+    forced = np.unique(np.asarray(forced, dtype=np.int64))
+    picked = lttb_indices(x, y, max(3, max_points - len(forced)))
+    return np.union1d(picked, forced)
+
+
+def _max_points(value) -> int | None:
+    """Valide le paramètre ``max_points`` (ValueError si invalide)."""
+    if value in (None, ''):
+        return None
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value < 3:
+        raise ValueError('max_points must be an integer >= 3')
+    return value
 
 
-        TREND_CACHE[period] = (now, out)
 @app.route('/api/chart-data')
 def chart_data():
-    conn = get_db_connection()
-    rows = conn.execute('SELECT date, price, fg FROM data ORDER BY date').fetchall()
-    conn.close()
-    dates = [r['date'] for r in rows]
-    prices = [r['price'] for r in rows]
-    fg = [r['fg'] for r in rows]
-    return jsonify({'dates': dates, 'prices': prices, 'fg': fg})
+    """
+    Prix et FGI de toute la période.
+
+    ``?since=YYYY-MM-DD`` ne renvoie que les points strictement postérieurs,
+    pour un rafraîchissement incrémental côté client ; ``?max_points=N``
+    sous-échantillonne la série de prix (LTTB) à environ N points. La
+    réponse JSON est déjà en colonnes ; ``format=binary`` (ou ``binary32``)
+    renvoie les tampons binaires de ``encode_binary`` (table ``chart``).
+
+    ``?resolution=weekly|monthly`` renvoie les agrégats OHLC précalculés
+    (:meth:`PriceStore.aggregate`) au lieu des séances quotidiennes ; avec
+    ``since``, la période en cours est renvoyée dès qu'elle a une séance
+    plus récente et remplace côté client celle de même période.
+    """
+    store = get_price_store()
+    resolution = request.args.get('resolution', 'daily')
+    if resolution not in RESOLUTIONS:
+        return jsonify({'error': f"resolution must be one of {', '.join(RESOLUTIONS)}"}), 400
+    if resolution == 'daily':
+        series = {'dates': store.dates, 'prices': store.prices, 'fg': store.fgs}
+        ordinals = store.ordinals
+    else:
+        series, ordinals = store.aggregate(resolution)
+    since = request.args.get('since')
+    first = 0
+    if since:
+        try:
+            since = date.fromisoformat(since).isoformat()
+        except ValueError:
+            return jsonify({'error': 'since must be YYYY-MM-DD'}), 400
+        first = int(np.searchsorted(series['dates'], since, side='right'))
+    try:
+        max_points = _max_points(request.args.get('max_points'))
+        fmt = series_format(request.args.get('format'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    binary = fmt in ('binary', 'binary32')
+
+    def build():
+        idx = first + downsample_indices(
+            ordinals[first:], series['prices'][first:], max_points
+        )
+        columns = {name: values[idx] for name, values in series.items()}
+        if binary:
+            return encode_binary(
+                {'chart': columns}, {}, '<f4' if fmt == 'binary32' else '<f8'
+            )
+        return {name: values.tolist() for name, values in columns.items()}
+
+    return cached_response(
+        store, ('chart-data', resolution, first, max_points, binary and fmt), build,
+        BINARY_MIMETYPE if binary else 'application/json',
+    )
 
 
 @app.route('/trends')
 def trends():
     period = request.args.get('period', 'month')
-    now = time.time()
-    cached = TREND_CACHE.get(period)
-    if cached and now - cached[0] < TREND_TTL:
-        return jsonify(cached[1])
     try:
-        data = get_trends_json(period)
-        TREND_CACHE[period] = (now, data)
-        return jsonify(data)
+        return jsonify(TRENDS.get(period))
     except Exception as exc:
         logging.error("Erreur trends: %s", exc)
         return jsonify({'error': str(exc)}), 500
@@ -579,8 +1747,7 @@ def trend_data():
     """Return trend data, avoiding network calls on Render deployments."""
     period = request.args.get('period', 'month')
     try:
-        allow_fetch = not os.getenv("RENDER")
-        out = get_trends_json(period, allow_fetch=allow_fetch)
+        out = TRENDS.get(period)
         if not out['scores']:
             return jsonify({"scores": [], "error": "Tendance indisponible"}), 200
         return jsonify(out)
@@ -590,84 +1757,168 @@ def trend_data():
 @app.route('/api/data')
 def get_data():
     date = request.args.get('date')
-    conn = get_db_connection()
-    row = conn.execute('SELECT price, fg FROM data WHERE date=?', (date,)).fetchone()
-    conn.close()
-    if row:
-        return jsonify({'price': row['price'], 'fg': row['fg']})
+    store = get_price_store()
+    i = store.index_of(date) if date else None
+    if i is not None:
+        return jsonify({'price': float(store.prices[i]), 'fg': int(store.fgs[i])})
     return jsonify({'error': 'date not found'}), 404
 
 
+DCA_STREAM_CHUNK = 2048  # jours simulés (et lignes NDJSON envoyées) par paquet
+DCA_ROW_FIELDS = {
+    'progress': ('date', 'value', 'btc', 'lump_value', 'perf_rel', 'buy'),
+    'purchases': ('date', 'amount', 'btc', 'price'),
+}
+
+
+def iter_dca(store: PriceStore, first: int, amount: float, step: int):
+    """
+    DCA classique jour par jour depuis l'indice ``first``, sous forme
+    d'événements ``(kind, row)`` : ``'purchase'`` précède la ligne
+    ``'progress'`` d'un jour d'achat, ``'summary'`` clôt la série. Le
+    snapshot est lu par paquets de ``DCA_STREAM_CHUNK`` jours : la mémoire
+    reste constante quelle que soit la période.
+    """
+    n = len(store) - first
+    num_purchases = len(range(0, n, step))
+    lump_btc = (num_purchases * amount / float(store.prices[first])) if n else 0.0
+    btc_total = 0.0
+    invested = 0.0
+    price = None
+
+    for lo in range(0, n, DCA_STREAM_CHUNK):
+        hi = min(n, lo + DCA_STREAM_CHUNK)
+        dates = store.dates[first + lo:first + hi].tolist()
+        prices = store.prices[first + lo:first + hi].tolist()
+        for i, (day, price) in enumerate(zip(dates, prices), lo):
+            is_buy = i % step == 0
+            if is_buy:
+                btc = amount / price
+                btc_total += btc
+                invested += amount
+                yield 'purchase', {'date': day, 'amount': amount, 'btc': btc, 'price': price}
+            portfolio_value = btc_total * price
+            lump_value = lump_btc * price
+            perf_rel = (portfolio_value / invested - 1) if invested else 0
+            yield 'progress', {
+                'date': day,
+                'value': portfolio_value,
+                'btc': btc_total,
+                'lump_value': lump_value,
+                'perf_rel': perf_rel,
+                'buy': is_buy
+            }
+
+    final_value = btc_total * price if n else 0
+    lump_final = lump_btc * price if n else 0
+    performance = ((final_value - invested) / invested * 100) if invested else 0
+    yield 'summary', {
+        'num_purchases': num_purchases,
+        'total_invested': invested,
+        'total_btc': btc_total,
+        'final_value': final_value,
+        'lump_value': lump_final,
+        'performance_pct': performance,
+    }
+
+
+def _log_dca_summary(summary: dict) -> None:
+    logging.info("/api/dca result: %s", {
+        k: summary[k] for k in (
+            'num_purchases', 'total_invested', 'total_btc', 'final_value',
+            'performance_pct',
+        )
+    })
+
+
 @app.route('/api/dca', methods=['POST'])
 def dca():
+    """
+    DCA classique. Avec ``"stream": true`` (ou ``Accept:
+    application/x-ndjson``), la réponse est du NDJSON envoyé au fil de la
+    simulation : une ligne ``{"type": "purchase" | "progress", ...}`` par
+    événement, puis une ligne ``{"type": "summary", ...}``. Sinon ``format``
+    (voir ``SERIES_FORMATS``) choisit la forme de ``progress``/``purchases``.
+    """
     data = request.get_json()
     logging.info("/api/dca params: %s", data)
     amount = float(data.get('amount'))
     start = data.get('start')
     freq = data.get('frequency')
-    conn = get_db_connection()
-    rows = conn.execute('SELECT date, price FROM data WHERE date >= ? ORDER BY date', (start,)).fetchall()
-    conn.close()
+    try:
+        max_points = _max_points(data.get('max_points'))
+        fmt = series_format(data.get('format') or request.args.get('format'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    stream = bool(data.get('stream')) or (
+        request.accept_mimetypes.best == 'application/x-ndjson'
+    )
+    if stream and (max_points is not None or fmt != 'json'):
+        return jsonify({'error': 'max_points and format are not supported when streaming'}), 400
+    store = get_price_store()
+    first = store.start_index(start)
     step = {'daily': 1, 'weekly': 7, 'monthly': 30}[freq]
-    btc_total = 0.0
-    invested = 0.0
+
+    if stream:
+        def generate():
+            lines = []
+            for kind, row in iter_dca(store, first, amount, step):
+                lines.append(json.dumps({'type': kind, **row}))
+                if len(lines) >= DCA_STREAM_CHUNK or kind == 'summary':
+                    yield '\n'.join(lines) + '\n'
+                    lines = []
+                if kind == 'summary':
+                    _log_dca_summary(row)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
     progress = []
     purchases = []
-    purchase_indices = list(range(0, len(rows), step))
-    lump_btc = (len(purchase_indices) * amount / rows[0]['price']) if rows else 0.0
+    for kind, row in iter_dca(store, first, amount, step):
+        if kind == 'progress':
+            progress.append(row)
+        elif kind == 'purchase':
+            purchases.append(row)
+        else:
+            summary = row
+
+    if max_points is not None and len(progress) > max_points:
+        # courbe de valeur allégée, achats (marqueurs) conservés si possible ;
+        # la liste ``purchases`` reste complète
+        keep = downsample_indices(
+            store.ordinals[first:], [p['value'] for p in progress],
+            max_points, keep=range(0, len(progress), step),
+        )
+        progress = [progress[i] for i in keep]
 
-    for i, r in enumerate(rows):
-        is_buy = i % step == 0
-        if is_buy:
-            btc = amount / r['price']
-            btc_total += btc
-            invested += amount
-            purchases.append({'date': r['date'], 'amount': amount, 'btc': btc, 'price': r['price']})
-        portfolio_value = btc_total * r['price']
-        lump_value = lump_btc * r['price']
-        perf_rel = (portfolio_value / invested - 1) if invested else 0
-        progress.append({
-            'date': r['date'],
-            'value': portfolio_value,
-            'btc': btc_total,
-            'lump_value': lump_value,
-            'perf_rel': perf_rel,
-            'buy': is_buy
-        })
+    _log_dca_summary(summary)
+    return series_response(
+        fmt, summary, {'progress': progress, 'purchases': purchases}, DCA_ROW_FIELDS
+    )
 
-    final_value = btc_total * rows[-1]['price'] if rows else 0
-    lump_final = lump_btc * rows[-1]['price'] if rows else 0
-    performance = ((final_value - invested) / invested * 100) if invested else 0
 
-    result = {
-        'num_purchases': len(purchase_indices),
-        'total_invested': invested,
-        'total_btc': btc_total,
-        'final_value': final_value,
-        'lump_value': lump_final,
-        'performance_pct': performance,
-        'progress': progress,
-        'purchases': purchases
-    }
-    logging.info("/api/dca result: %s", {
-        'num_purchases': len(purchase_indices),
-        'total_invested': invested,
-        'total_btc': btc_total,
-        'final_value': final_value,
-        'performance_pct': performance
-    })
-    return jsonify(result)
+SMART_DCA_ROW_FIELDS = {
+    'history': ('date', 'fgi', 'action', 'amount', 'bonus', 'total', 'bag', 'btc'),
+}
 
 
 @app.route('/api/smart-dca', methods=['POST'])
 def smart_dca():
-    """DCA ajusté avec l’indice Fear & Greed – version unique & fiable."""
+    """
+    DCA ajusté avec l’indice Fear & Greed – version unique & fiable.
+
+    ``format`` (voir ``SERIES_FORMATS``) choisit la forme de ``history``.
+    """
     data = request.get_json() or {}
     logging.info("/api/smart-dca params: %s", data)
 
     amount   = float(data.get('amount'))
     start    = data.get('start')
     freq     = data.get('frequency')
+    try:
+        fmt = series_format(data.get('format') or request.args.get('format'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
 
     # ------------ Parsing des paramètres avancés ------------
     def _to_int(v, d):   # petit helper robuste
@@ -682,20 +1933,19 @@ def smart_dca():
     pct  = _to_float(data.get('bag_bonus_pct'),    20) / 100.0   # fraction 0-1
     bmax = _to_float(data.get('bag_bonus_max'),   300)
 
-    # ------------ Récupération des données ------------
-    conn = get_db_connection()
-    rows = conn.execute(
-        'SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date',
-        (start,)
-    ).fetchall()
-    conn.close()
-
     step = {'weekly': 7, 'monthly': 30}.get(freq)
     if step is None:
         return jsonify({'error': 'frequency must be weekly or monthly'}), 400
 
+    # ------------ Récupération des données ------------
+    prices, fgs, last_price = store_smart_dca_arrays(start, step)
+    store = get_price_store()
+    dates = store.dates[store.start_index(start)::step].tolist()
+
     # ========== CALCUL CENTRAL ==========
-    sim = simulate_smart_dca_rows(rows, step, amount, high, low, pct, bmax)
+    sim = simulate_smart_dca_arrays(
+        prices, fgs, last_price, amount, high, low, pct, bmax
+    )
 
     # ========== (Optionnel) Reconstitution d’un historique ==========
     # -> si votre front-end n’en a pas besoin, vous pouvez supprimer
@@ -703,9 +1953,7 @@ def smart_dca():
     btc_total = invested = bag = 0.0
     max_bag = 12 * amount
 
-    for i, r in enumerate(rows):
-        if i % step: continue
-        fg = r['fg']
+    for day, price, fg in zip(dates, prices.tolist(), fgs.tolist()):
         bonus = 0.0
         action = "invest"
         invest_amount = amount
@@ -722,12 +1970,12 @@ def smart_dca():
 
         btc = 0.0
         if invest_amount:
-            btc = invest_amount / r['price']
+            btc = invest_amount / price
             btc_total += btc
             invested  += invest_amount
 
         hist.append({
-            'date': r['date'], 'fgi': fg, 'action': action,
+            'date': day, 'fgi': fg, 'action': action,
             'amount': amount if action != "to_bag" else 0.0,
             'bonus': bonus, 'total': invest_amount,
             'bag': bag, 'btc': btc_total,
@@ -747,324 +1995,851 @@ def smart_dca():
         'bag_used'       : sim['bag_used'],
         'bag_remaining'  : sim['bag_remaining'],
         'performance_pct': sim['performance_pct'],
-        'history'        : hist,         # <- utile pour vos graphiques
     }
     logging.info("/api/smart-dca result: %s", {
         k: result[k] for k in (
             'total_invested','final_value','bag_remaining','performance_pct')
     })
-    return jsonify(result)
+    # history : utile pour vos graphiques
+    return series_response(fmt, result, {'history': hist}, SMART_DCA_ROW_FIELDS)
+
+
+
+FR_DAYS = [
+    'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche'
+]
+# Seaux d'achat de /api/best-days : (libellé, attribut du PriceStore,
+# nombre de seaux, libellé de chaque seau)
+BEST_DAY_BUCKETS = (
+    ('Hebdo', 'weekdays', 7, FR_DAYS.__getitem__),
+    ('Mensuel', 'days', 32, str),
+)
+BEST_DAY_MODES = ('all', 'yearly', 'rolling')
+
+
+def _bucket_totals(keys, prices, amount, n_buckets):
+    """
+    Achats DCA groupés par seau en un seul passage : BTC accumulés, montant
+    investi et nombre d'achats pour chaque valeur de ``keys``.
+    """
+    btc = np.bincount(keys, weights=amount / prices, minlength=n_buckets)
+    invested = np.bincount(
+        keys, weights=np.full(len(keys), amount), minlength=n_buckets
+    )
+    num = np.bincount(keys, minlength=n_buckets)
+    return btc, invested, num
+
+
+def _bucket_perf(btc, invested, last_price):
+    final_value = btc * last_price
+    with np.errstate(divide='ignore', invalid='ignore'):
+        perf = np.where(invested > 0, (final_value - invested) / invested * 100, 0.0)
+    return final_value, perf
+
+
+def _best_day_entry(frequency, label, num, invested, final_value, perf, **extra):
+    return {
+        **extra,
+        'frequency': frequency,
+        'day': label,
+        'num_purchases': int(num),
+        'total_invested': float(invested),
+        'final_value': float(final_value),
+        'performance_pct': float(perf),
+    }
+
+
+def _best_days_all(store, first, amount):
+    """Performance de chaque jour de semaine / du mois sur toute la période."""
+    prices = store.prices[first:]
+    last_price = prices[-1]
+    results = []
+    for frequency, attr, n_buckets, label in BEST_DAY_BUCKETS:
+        keys = getattr(store, attr)[first:]
+        btc, invested, num = _bucket_totals(keys, prices, amount, n_buckets)
+        final_value, perf = _bucket_perf(btc, invested, last_price)
+        for d in np.flatnonzero(num):
+            results.append(_best_day_entry(
+                frequency, label(d), num[d], invested[d], final_value[d], perf[d]
+            ))
+    return results
+
+
+def _best_days_yearly(store, first, amount):
+    """
+    Meilleur jour de semaine et meilleur jour du mois pour chaque année
+    civile, achats et valorisation (dernier prix de l'année) limités à
+    l'année.
+    """
+    prices = store.prices[first:]
+    years = store.years[first:]
+    year_values, year_idx = np.unique(years, return_inverse=True)
+    year_last = np.r_[np.flatnonzero(np.diff(year_idx)), len(prices) - 1]
+    results = []
+    for frequency, attr, n_buckets, label in BEST_DAY_BUCKETS:
+        keys = year_idx * n_buckets + getattr(store, attr)[first:]
+        btc, invested, num = (
+            a.reshape(len(year_values), n_buckets)
+            for a in _bucket_totals(keys, prices, amount, len(year_values) * n_buckets)
+        )
+        final_value, perf = _bucket_perf(btc, invested, prices[year_last][:, None])
+        perf = np.where(num > 0, perf, -np.inf)
+        for y, d in enumerate(perf.argmax(axis=1)):
+            results.append(_best_day_entry(
+                frequency, label(d), num[y, d], invested[y, d],
+                final_value[y, d], perf[y, d], year=int(year_values[y]),
+            ))
+    return results
+
 
+def _best_days_rolling(store, first, amount, window, stride):
+    """
+    Meilleur jour de semaine et du mois sur des fenêtres glissantes de
+    ``window`` jours calendaires, décalées de ``stride`` jours. Les sommes
+    par fenêtre sont des différences de sommes cumulées par seau.
+    """
+    prices = store.prices[first:]
+    ordinals = store.ordinals[first:]
+    starts = np.arange(ordinals[0], ordinals[-1] - window + 2, stride)
+    if not len(starts):
+        return []
+    lo = np.searchsorted(ordinals, starts, side='left')
+    hi = np.searchsorted(ordinals, starts + window, side='left')
+    # Fenêtres tombant dans un trou de données : aucun jour à comparer
+    filled = hi > lo
+    lo, hi = lo[filled], hi[filled]
+    window_last = prices[hi - 1]
+    per_unit = amount / prices
+    results = []
+    for frequency, attr, n_buckets, label in BEST_DAY_BUCKETS:
+        keys = getattr(store, attr)[first:]
+        btc = np.empty((len(lo), n_buckets))
+        num = np.empty((len(lo), n_buckets), dtype=np.int64)
+        for b in range(n_buckets):
+            hit = keys == b
+            cum_btc = np.concatenate(([0.0], np.cumsum(np.where(hit, per_unit, 0.0))))
+            cum_num = np.concatenate(([0], np.cumsum(hit)))
+            btc[:, b] = cum_btc[hi] - cum_btc[lo]
+            num[:, b] = cum_num[hi] - cum_num[lo]
+        invested = num * amount
+        final_value, perf = _bucket_perf(btc, invested, window_last[:, None])
+        perf = np.where(num > 0, perf, -np.inf)
+        for w, d in enumerate(perf.argmax(axis=1)):
+            results.append(_best_day_entry(
+                frequency, label(d), num[w, d], invested[w, d],
+                final_value[w, d], perf[w, d],
+                start=str(store.dates[first + lo[w]]),
+                end=str(store.dates[first + hi[w] - 1]),
+            ))
+    return results
 
 
 @app.route('/api/best-days', methods=['POST'])
 def best_days():
-    """Simulate DCA for each weekday and day of month."""
+    """
+    Simulate DCA for each weekday and day of month.
+
+    ``mode`` : ``all`` (défaut, toute la période), ``yearly`` (meilleur jour
+    par année civile) ou ``rolling`` (meilleur jour par fenêtre glissante de
+    ``window`` jours, décalée de ``stride`` jours).
+    """
     data = request.get_json()
     logging.info("/api/best-days params: %s", data)
     amount = float(data.get('amount'))
     start = data.get('start')
+    mode = data.get('mode', 'all')
+    if mode not in BEST_DAY_MODES:
+        return jsonify({'error': f"mode must be one of {', '.join(BEST_DAY_MODES)}"}), 400
 
-    conn = get_db_connection()
-    rows = conn.execute(
-        'SELECT date, price FROM data WHERE date >= ? ORDER BY date',
-        (start,)
-    ).fetchall()
-    conn.close()
-
-    if not rows:
+    store = get_price_store()
+    first = store.start_index(start)
+    if first >= len(store):
         return jsonify([])
 
-    last_price = rows[-1]['price']
-    results = []
-    fr_days = [
-        'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche'
-    ]
-
-    for d in range(7):
-        btc_total = invested = num = 0
-        for r in rows:
-            dt = datetime.strptime(r['date'], '%Y-%m-%d')
-            if dt.weekday() == d:
-                btc_total += amount / r['price']
-                invested += amount
-                num += 1
-        if num:
-            final_value = btc_total * last_price
-            perf = ((final_value - invested) / invested * 100) if invested else 0
-            results.append({
-                'frequency': 'Hebdo',
-                'day': fr_days[d],
-                'num_purchases': num,
-                'total_invested': invested,
-                'final_value': final_value,
-                'performance_pct': perf,
-            })
-
-    for d in range(1, 32):
-        btc_total = invested = num = 0
-        for r in rows:
-            dt = datetime.strptime(r['date'], '%Y-%m-%d')
-            if dt.day == d:
-                btc_total += amount / r['price']
-                invested += amount
-                num += 1
-        if num:
-            final_value = btc_total * last_price
-            perf = ((final_value - invested) / invested * 100) if invested else 0
-            results.append({
-                'frequency': 'Mensuel',
-                'day': str(d),
-                'num_purchases': num,
-                'total_invested': invested,
-                'final_value': final_value,
-                'performance_pct': perf,
-            })
+    if mode == 'yearly':
+        results = _best_days_yearly(store, first, amount)
+    elif mode == 'rolling':
+        try:
+            window = int(data.get('window', 365))
+            stride = int(data.get('stride', 30))
+        except (TypeError, ValueError):
+            window = stride = 0
+        if window < 1 or stride < 1:
+            return jsonify({'error': 'window and stride must be positive integers'}), 400
+        results = _best_days_rolling(store, first, amount, window, stride)
+    else:
+        results = _best_days_all(store, first, amount)
     logging.info("/api/best-days result count: %d", len(results))
 
     return jsonify(results)
 
 
-@app.route('/api/optimize-smart-dca', methods=['POST'])
-def optimize_smart_dca():
-    """Grid search to find best smart DCA parameters."""
-    data = request.get_json() or {}
-    logging.info("/api/optimize-smart-dca params: %s", data)
-    amount = float(data.get('amount'))
-    start = data.get('start')
-    freq = data.get('frequency')
+GRID_CHUNK = 1024  # candidats simulés entre deux événements de progression
 
-    step = {'weekly': 7, 'monthly': 30}.get(freq)
-    if step is None:
-        return jsonify({'error': 'frequency must be weekly or monthly'}), 400
 
-    conn = get_db_connection()
-    rows = conn.execute(
-        'SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date',
-        (start,)
-    ).fetchall()
-    conn.close()
+def _search_entry(point, perf):
+    return dict(zip(GA_PARAM_NAMES, map(int, point)), performance_pct=float(perf))
 
-    best = None
-    second = None
-    count = 0
 
-    total_primary = (
-        len(range(60, 95, 5))
-        * len(range(5, 55, 5))
-        * len(range(5, 55, 5))
-        * len(range(50, 550, 50))
-    )
-    logging.info("Starting optimization: %d combinations", total_primary)
-
-    for high in range(60, 95, 5):
-        for low in range(5, 55, 5):
-            for pct in range(5, 55, 5):
-                for bmax in range(50, 550, 50):
-                    result = simulate_smart_dca_rows(
-                        rows, step, amount, high, low, pct / 100.0, bmax
-                    )
-                    count += 1
-                    entry = {
-                        'fg_threshold_high': high,
-                        'fg_threshold_low': low,
-                        'bag_bonus_pct': pct,
-                        'bag_bonus_max': bmax,
-                        'performance_pct': result['performance_pct'],
-                    }
-                    if not best or entry['performance_pct'] > best['performance_pct']:
-                        second = best
-                        best = entry
-                    elif not second or entry['performance_pct'] > second['performance_pct']:
-                        second = entry
-                    if count % 500 == 0 or count == total_primary:
-                        logging.info(
-                            "Progress: %d/%d (%.1f%%)",
-                            count,
-                            total_primary,
-                            count / total_primary * 100,
-                        )
+def iter_grid_search(amount, start, step):
+    """
+    Recherche par grille des meilleurs paramètres smart DCA, sous forme de
+    générateur d'événements.
+
+    Grille primaire (pas de 5 / 50) puis affinage au pas de 1 autour du
+    meilleur candidat. Produit dans l'ordre ``primary_start``,
+    ``primary_progress`` (après chaque bloc de ``GRID_CHUNK`` candidats),
+    ``primary_end``, ``refine_progress`` et enfin ``finish`` qui porte le
+    résultat (``tested``, ``best``, ``second_best``...).
+    """
+    prices, fgs, last_price = store_smart_dca_arrays(start, step)
+
+    def evaluate(phase, candidates, best):
+        perfs = np.empty(len(candidates))
+        for lo in range(0, len(candidates), GRID_CHUNK):
+            hi = min(lo + GRID_CHUNK, len(candidates))
+            perfs[lo:hi] = simulate_smart_dca_batch(
+                prices, fgs, last_price, amount, candidates[lo:hi]
+            )
+            i = lo + int(np.argmax(perfs[lo:hi]))
+            if best is None or perfs[i] > best['performance_pct']:
+                best = _search_entry(candidates[i], perfs[i])
+            yield {
+                'phase': phase, 'count': hi, 'total': len(candidates),
+                'best': best, 'best_perf': best['performance_pct'],
+            }
+        return perfs
+
+    primary = np.array(list(itertools.product(
+        range(60, 95, 5), range(5, 55, 5), range(5, 55, 5), range(50, 550, 50)
+    )))
+    logging.info("Starting optimization: %d combinations", len(primary))
+    yield {'phase': 'primary_start', 'total': len(primary)}
+    perfs = yield from evaluate('primary_progress', primary, None)
+    best_idx, _ = _top_two(perfs)
+    best = _search_entry(primary[best_idx], perfs[best_idx])
 
     # refine search around best candidate with step of 1
-    if best:
-        base_high = best['fg_threshold_high']
-        base_low = best['fg_threshold_low']
-        base_pct = best['bag_bonus_pct']
-        base_bmax = best['bag_bonus_max']
-
-        range_high = [h for h in range(base_high - 5, base_high + 6) if 0 <= h <= 100]
-        range_low = [l for l in range(base_low - 5, base_low + 6) if 0 <= l <= 100]
-        range_pct = [p for p in range(base_pct - 5, base_pct + 6) if 0 <= p <= 100]
-        range_bmax = [b for b in range(base_bmax - 5, base_bmax + 6) if b > 0]
-        total_refine = (
-            len(range_high) * len(range_low) * len(range_pct) * len(range_bmax)
-        )
+    base_high = best['fg_threshold_high']
+    base_low = best['fg_threshold_low']
+    base_pct = best['bag_bonus_pct']
+    base_bmax = best['bag_bonus_max']
+
+    range_high = [h for h in range(base_high - 5, base_high + 6) if 0 <= h <= 100]
+    range_low = [l for l in range(base_low - 5, base_low + 6) if 0 <= l <= 100]
+    range_pct = [p for p in range(base_pct - 5, base_pct + 6) if 0 <= p <= 100]
+    range_bmax = [b for b in range(base_bmax - 5, base_bmax + 6) if b > 0]
+    refine = np.array(list(itertools.product(
+        range_high, range_low, range_pct, range_bmax
+    )))
+    logging.info(
+        "Refine search around best candidate: %d combinations", len(refine)
+    )
+    yield {'phase': 'primary_end', 'best': best, 'total_refine': len(refine)}
+    refine_perfs = yield from evaluate('refine_progress', refine, best)
+
+    # Même départage que le parcours séquentiel : primaire puis affinage
+    perfs = np.concatenate([perfs, refine_perfs])
+    candidates = np.concatenate([primary, refine])
+    best_idx, second_idx = _top_two(perfs)
+    result = {
+        'tested': len(candidates),
+        'tested_phase1': len(primary),
+        'tested_phase2': len(refine),
+        'best': _search_entry(candidates[best_idx], perfs[best_idx]),
+    }
+    if second_idx is not None:
+        result['second_best'] = _search_entry(candidates[second_idx], perfs[second_idx])
+    yield {'phase': 'finish', **result}
+
+
+# Domaine de la recherche multi-résolution : l'enveloppe de la grille
+# primaire + affinage de iter_grid_search.
+SEARCH_BOUNDS: List[Tuple[int, int]] = [
+    (55, 95),   # fg_threshold_high
+    (0, 55),    # fg_threshold_low
+    (1, 55),    # bag_bonus_pct
+    (45, 545),  # bag_bonus_max
+]
+
+
+def iter_multires_search(
+    amount, start, step, *,
+    bounds: List[Tuple[int, int]] = SEARCH_BOUNDS,
+    coarse: int = 5,
+    top_k: int = 4,
+    budget: int | None = None,
+):
+    """
+    Recherche multi-résolution (coarse-to-fine) des paramètres smart DCA,
+    sous forme de générateur d'événements.
+
+    Un réseau grossier de ``coarse`` points par dimension est évalué, puis
+    à chaque niveau on garde les ``top_k`` meilleures cellules (scores
+    distincts, pour ne pas raffiner k fois le même plateau) et on les
+    subdivise en divisant le pas par deux, jusqu'au pas de 1. Les seuils
+    FGI sont enfin balayés au pas de 1 autour du meilleur point. Les points
+    déjà simulés ne le sont jamais deux fois ; ``budget`` borne le nombre
+    total de simulations.
+
+    Produit un événement ``level_progress`` par niveau (``total`` compte les
+    niveaux de subdivision, balayages non compris) puis ``finish`` avec
+    ``tested``, ``exhaustive`` (taille de la grille complète au pas de 1),
+    ``levels``, ``best`` et ``second_best``.
+
+    Heuristique : elle peut manquer l'optimum de la grille (plateau ou pic
+    isolé entre deux points du réseau grossier), d'où ``method='grid'`` par
+    défaut et ``'multires'`` sur demande seulement.
+    """
+    prices, fgs, last_price = store_smart_dca_arrays(start, step)
+    scores: Dict[Tuple[int, ...], float] = {}
+
+    def evaluate(points):
+        new = [p for p in dict.fromkeys(points) if p not in scores]
+        if budget is not None:
+            new = new[:max(0, budget - len(scores))]
+        if new:
+            perfs = simulate_smart_dca_batch(
+                prices, fgs, last_price, amount, np.array(new)
+            )
+            scores.update(zip(new, perfs.tolist()))
+
+    def ranked(k):
+        out, seen_perfs = [], set()
+        for point, perf in sorted(scores.items(), key=lambda kv: -kv[1]):
+            if perf not in seen_perfs:
+                seen_perfs.add(perf)
+                out.append((point, perf))
+                if len(out) == k:
+                    break
+        return out
+
+    def clamp(point):
+        return tuple(min(b, max(a, v)) for v, (a, b) in zip(point, bounds))
+
+    spacing = [max(1, math.ceil((b - a) / (coarse - 1))) for a, b in bounds]
+    widest, levels = max(spacing), 1
+    while widest > 1:
+        widest, levels = math.ceil(widest / 2), levels + 1
+
+    axes = [
+        sorted({int(round(v)) for v in np.linspace(a, b, coarse)})
+        for a, b in bounds
+    ]
+    logging.info("Multi-resolution search: %d levels, top_k=%d", levels, top_k)
+    evaluate(list(itertools.product(*axes)))
+    level, swept = 1, float('-inf')
+    while True:
+        best = _search_entry(*ranked(1)[0])
         logging.info(
-            "Refine search around best candidate: %d combinations", total_refine
+            "Level %d/%d: %d simulations, best %.4f",
+            level, levels, len(scores), best['performance_pct'],
         )
+        yield {
+            'phase': 'level_progress', 'count': level, 'total': levels,
+            'best': best, 'best_perf': best['performance_pct'],
+            'tested': len(scores),
+        }
+        if budget is not None and len(scores) >= budget:
+            break
+        if max(spacing) > 1:
+            spacing = [max(1, math.ceil(s / 2)) for s in spacing]
+            offsets = list(itertools.product(*[(-s, 0, s) for s in spacing]))
+            evaluate([
+                clamp(tuple(c + o for c, o in zip(center, offset)))
+                for center, _ in ranked(top_k)
+                for offset in offsets
+            ])
+        elif best['performance_pct'] > swept:
+            # Les seuils FGI créent des plateaux que la subdivision rate :
+            # on balaie chaque seuil au pas de 1 autour du meilleur point,
+            # tant que cela l'améliore.
+            swept = best['performance_pct']
+            center = ranked(1)[0][0]
+            evaluate([
+                center[:d] + (v,) + center[d + 1:]
+                for d in (0, 1)
+                for v in range(bounds[d][0], bounds[d][1] + 1)
+            ])
+        else:
+            break
+        level += 1
+
+    top = sorted(scores.items(), key=lambda kv: -kv[1])[:2]
+    result = {
+        'tested': len(scores),
+        'exhaustive': math.prod(b - a + 1 for a, b in bounds),
+        'levels': level,
+        'best': _search_entry(*top[0]),
+    }
+    if len(top) > 1:
+        result['second_best'] = _search_entry(*top[1])
+    yield {'phase': 'finish', **result}
+
+
+def iter_search_events(method, amount, start, step, **options):
+    """Générateur d'événements de la méthode demandée ('grid' ou 'multires')."""
+    if method == 'grid':
+        return iter_grid_search(amount, start, step)
+    if method == 'multires':
+        return iter_multires_search(amount, start, step, **options)
+    raise ValueError('method must be multires or grid')
 
-        for high in range_high:
-            for low in range_low:
-                for pct in range_pct:
-                    for bmax in range_bmax:
-                        result = simulate_smart_dca_rows(
-                            rows, step, amount, high, low, pct / 100.0, bmax
-                        )
-                        count += 1
-                        entry = {
-                            'fg_threshold_high': high,
-                            'fg_threshold_low': low,
-                            'bag_bonus_pct': pct,
-                            'bag_bonus_max': bmax,
-                            'performance_pct': result['performance_pct'],
-                        }
-                        if entry['performance_pct'] > best['performance_pct']:
-                            second = best
-                            best = entry
-                        elif (
-                            not second
-                            or entry['performance_pct'] > second['performance_pct']
-                        ):
-                            second = entry
-                        if (count - total_primary) % 500 == 0 or (
-                            count - total_primary
-                        ) == total_refine:
-                            logging.info(
-                                "Refine progress: %d/%d (%.1f%%)",
-                                count - total_primary,
-                                total_refine,
-                                (count - total_primary) / total_refine * 100,
-                            )
-
-    response = {'tested': count, 'best': best}
-    if second:
-        response['second_best'] = second
-    logging.info("/api/optimize-smart-dca tested=%d best=%s", count, best)
+
+def run_search(events, progress=None):
+    """
+    Consomme un générateur de recherche et renvoie le résultat final.
+
+    Les événements de progression (ceux qui ont un ``count``) sont transmis
+    à ``progress``, qui peut lever :class:`JobCancelled`.
+    """
+    for event in events:
+        if event['phase'] == 'finish':
+            return {k: v for k, v in event.items() if k != 'phase'}
+        if progress is not None and 'count' in event:
+            progress(event)
+    raise RuntimeError('search ended without a result')
+
+
+def throttle_events(events, interval):
+    """
+    Laisse passer au plus un événement de progression par ``interval``
+    secondes ; les autres événements (début/fin de phase...) passent tous.
+    """
+    last = float('-inf')
+    for event in events:
+        if 'count' in event and event['count'] < event['total']:
+            now = time.monotonic()
+            if now - last < interval:
+                continue
+            last = now
+        yield event
+
+
+SSE_PROGRESS_INTERVAL = 0.25  # secondes minimum entre deux événements SSE
+
+
+def _search_request(data):
+    """
+    Lit les paramètres communs aux endpoints d'optimisation (corps JSON ou
+    query string). Retourne ``(events, error)`` où ``events`` est le
+    générateur de la recherche demandée.
+    """
+    step = {'weekly': 7, 'monthly': 30}.get(data.get('frequency'))
+    if step is None:
+        return None, 'frequency must be weekly or monthly'
+    method = data.get('method', 'grid')
+    try:
+        options = {}
+        if method == 'multires':
+            budget = data.get('budget')
+            options = {
+                'coarse': int(data.get('coarse', 5)),
+                'top_k': int(data.get('top_k', 4)),
+                'budget': int(budget) if budget is not None else None,
+            }
+            # le générateur est paresseux : une valeur invalide ne lèverait
+            # qu'en cours de recherche (500, ou au milieu du flux SSE)
+            if options['coarse'] < 2:
+                raise ValueError('coarse must be >= 2')
+            if options['top_k'] < 1:
+                raise ValueError('top_k must be >= 1')
+            if options['budget'] is not None and options['budget'] < 1:
+                raise ValueError('budget must be >= 1')
+        events = iter_search_events(
+            method, float(data.get('amount', 0)), data.get('start'), step, **options
+        )
+    except (TypeError, ValueError) as exc:
+        return None, str(exc)
+    return events, None
+
+
+@app.route('/api/optimize-smart-dca', methods=['POST'])
+def optimize_smart_dca():
+    """Search the best smart DCA parameters.
+
+    Exhaustive two-phase grid by default; ``method: "multires"`` runs the
+    much cheaper multi-resolution search, which may miss the grid optimum.
+    Same engine as the SSE endpoint.
+    """
+    data = request.get_json() or {}
+    logging.info("/api/optimize-smart-dca params: %s", data)
+    events, error = _search_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+    response = run_search(events)
+    logging.info(
+        "/api/optimize-smart-dca tested=%d best=%s",
+        response['tested'], response['best'],
+    )
     return jsonify(response)
 
 
 @app.route('/api/optimize-smart-dca-stream')
 def optimize_smart_dca_stream():
-    """Stream smart DCA optimization progress as Server-Sent Events."""
-    amount = float(request.args.get('amount', 0))
-    start = request.args.get('start')
-    freq = request.args.get('frequency')
+    """Stream smart DCA optimization progress as Server-Sent Events.
+
+    Runs the same search as ``/api/optimize-smart-dca``; progress events
+    are throttled to one per ``SSE_PROGRESS_INTERVAL`` seconds.
+    """
+    events, error = _search_request(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    def gen():
+        for event in throttle_events(events, SSE_PROGRESS_INTERVAL):
+            yield f"data:{json.dumps(event)}\n\n"
+
+    return Response(stream_with_context(gen()), mimetype='text/event-stream')
 
-    step = {'weekly': 7, 'monthly': 30}.get(freq)
-    if step is None:
-        return jsonify({'error': 'frequency must be weekly or monthly'}), 400
 
-    conn = get_db_connection()
-    rows = conn.execute(
-        'SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date',
-        (start,),
-    ).fetchall()
+# ----------------------------------------------------------------------
+# Jobs d'optimisation en arrière-plan
+# ----------------------------------------------------------------------
+# Les optimisations longues tournent sur un pool de threads borné ; leur
+# état vit dans une base SQLite séparée (non effacée par /reset-db) afin
+# que n'importe quel worker gunicorn puisse répondre au polling ou annuler.
+# Par défaut à côté de btc.db : deux instances (ou benchmarks) configurées
+# avec des BTC_DB_NAME différents ne partagent pas leurs jobs.
+JOBS_DB = os.environ.get("BTC_JOBS_DB", os.path.splitext(DB_NAME)[0] + "_jobs.db")
+JOB_CONCURRENCY = int(os.environ.get("JOB_CONCURRENCY", 2))
+JOB_PROGRESS_INTERVAL = 0.5  # secondes minimum entre deux écritures
+# Les jobs actifs d'un processus voient leur ``updated`` rafraîchi toutes
+# les JOB_HEARTBEAT secondes ; sans battement depuis JOB_STALE_AFTER, le
+# worker qui les portait est considéré mort (crash, redéploiement).
+JOB_HEARTBEAT = float(os.environ.get("JOB_HEARTBEAT", 15))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", 4 * JOB_HEARTBEAT))
+JOB_RETENTION = float(os.environ.get("JOB_RETENTION", 7 * 86400))  # jobs terminés
+JOB_KINDS = ('grid', 'genetic')
+_JOB_ACTIVE = ('queued', 'running')
+
+_JOB_EXECUTOR = ThreadPoolExecutor(
+    max_workers=JOB_CONCURRENCY, thread_name_prefix='optimize-job'
+)
+# Jobs soumis par ce processus et pas encore terminés (battement de cœur)
+_LOCAL_JOBS: set[str] = set()
+_LOCAL_JOBS_LOCK = threading.Lock()
+_HEARTBEAT_PID: int | None = None
+
+
+class JobCancelled(Exception):
+    """Levée par un callback de progression quand le job est annulé."""
+
+
+def init_jobs_db():
+    """Create the jobs table (kept across /reset-db)."""
+    conn = sqlite3.connect(JOBS_DB, timeout=SQLITE_TIMEOUT)
+    # WAL : le polling des autres workers ne bloque pas les mises à jour
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                    (id TEXT PRIMARY KEY,
+                     kind TEXT,
+                     key TEXT,
+                     params TEXT,
+                     status TEXT,
+                     progress REAL DEFAULT 0,
+                     best TEXT,
+                     result TEXT,
+                     error TEXT,
+                     cancel_requested INTEGER DEFAULT 0,
+                     created REAL,
+                     updated REAL)''')
+    # Un seul job actif par requête identique, même entre workers
+    conn.execute('''CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key
+                    ON jobs(key) WHERE status IN ('queued', 'running')''')
+    _expire_jobs(conn)
+    conn.commit()
     conn.close()
 
-    def gen():
-        best = None
-        second = None
-        count_primary = 0
-        total_primary = (
-            len(range(60, 95, 5))
-            * len(range(5, 55, 5))
-            * len(range(5, 55, 5))
-            * len(range(50, 550, 50))
+
+def _expire_jobs(conn) -> None:
+    """
+    Passe en ``failed`` les jobs actifs sans battement de cœur depuis
+    JOB_STALE_AFTER (leur worker a disparu : sans cela l'index unique
+    renverrait indéfiniment ce job mort aux requêtes identiques) et
+    supprime les jobs terminés depuis plus de JOB_RETENTION.
+    """
+    now = time.time()
+    expired = conn.execute(
+        "UPDATE jobs SET status = 'failed', error = 'worker lost (no heartbeat)', updated = ?"
+        " WHERE status IN (?, ?) AND updated < ?",
+        (now, *_JOB_ACTIVE, now - JOB_STALE_AFTER),
+    ).rowcount
+    if expired:
+        logging.warning("%d job(s) sans battement de cœur marqués en échec", expired)
+    conn.execute(
+        'DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated < ?',
+        (*_JOB_ACTIVE, now - JOB_RETENTION),
+    )
+
+
+def _job_heartbeat() -> None:
+    while True:
+        time.sleep(JOB_HEARTBEAT)
+        with _LOCAL_JOBS_LOCK:
+            ids = list(_LOCAL_JOBS)
+        if not ids:
+            continue
+        try:
+            with db_connection(JOBS_DB) as conn:
+                conn.execute(
+                    f"UPDATE jobs SET updated = ? WHERE status IN (?, ?)"
+                    f" AND id IN ({', '.join('?' * len(ids))})",
+                    (time.time(), *_JOB_ACTIVE, *ids),
+                )
+        except sqlite3.Error as exc:
+            logging.warning("Battement de cœur des jobs impossible : %s", exc)
+
+
+def _ensure_job_heartbeat() -> None:
+    """Démarre le thread de battement dans ce processus (une fois par fork)."""
+    global _HEARTBEAT_PID
+    with _LOCAL_JOBS_LOCK:
+        if _HEARTBEAT_PID == os.getpid():
+            return
+        _HEARTBEAT_PID = os.getpid()
+    threading.Thread(target=_job_heartbeat, name='job-heartbeat', daemon=True).start()
+
+
+if not _MP_WORKER:
+    init_jobs_db()
+
+
+def _job_to_dict(row) -> dict:
+    return {
+        'id': row['id'],
+        'kind': row['kind'],
+        'params': json.loads(row['params']),
+        'status': row['status'],
+        'progress': row['progress'],
+        'best': json.loads(row['best']) if row['best'] else None,
+        'result': json.loads(row['result']) if row['result'] else None,
+        'error': row['error'],
+        'created': row['created'],
+        'updated': row['updated'],
+    }
+
+
+def get_job(job_id: str) -> dict | None:
+    with db_connection(JOBS_DB) as conn:
+        row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    return _job_to_dict(row) if row else None
+
+
+def _update_job(job_id: str, **fields) -> sqlite3.Row:
+    """Met à jour le job et renvoie la ligne (pour lire cancel_requested)."""
+    fields['updated'] = time.time()
+    for k in ('best', 'result'):
+        if k in fields and fields[k] is not None:
+            fields[k] = json.dumps(fields[k])
+    cols = ', '.join(f'{k} = ?' for k in fields)
+    with db_connection(JOBS_DB) as conn:
+        conn.execute(f'UPDATE jobs SET {cols} WHERE id = ?', (*fields.values(), job_id))
+        row = conn.execute(
+            'SELECT status, cancel_requested FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+    return row
+
+
+def _bool_param(value) -> bool:
+    """Booléen JSON ou chaîne (``"false"``, ``"0"``...) ; ValueError sinon."""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('1', 'true', 'yes', 'on'):
+            return True
+        if value in ('0', 'false', 'no', 'off', ''):
+            return False
+    raise ValueError(f'invalid boolean: {value!r}')
+
+
+def _int_param(value, name: str) -> int:
+    """Entier JSON (ou chaîne) ; ValueError avec le nom du paramètre sinon."""
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'{name} must be an integer') from None
+
+
+def _workers_param(value) -> int:
+    """Nombre de processus du GA, borné à ``[1, os.cpu_count()]``."""
+    return max(1, min(_int_param(value, 'workers'), os.cpu_count() or 1))
+
+
+def _job_params(data: dict) -> dict:
+    """Valide et normalise les paramètres d'un job (ValueError sinon)."""
+    kind = data.get('kind')
+    if kind not in JOB_KINDS:
+        raise ValueError(f"kind must be one of {', '.join(JOB_KINDS)}")
+    freq = data.get('frequency', 'monthly')
+    if freq not in ('weekly', 'monthly'):
+        raise ValueError('frequency must be weekly or monthly')
+    params = {
+        'amount': float(data.get('amount', 100)),
+        'start': data.get('start', '2018-01-01'),
+        'frequency': freq,
+    }
+    if kind == 'grid':
+        params['method'] = data.get('method', 'grid')
+        if params['method'] not in ('multires', 'grid'):
+            raise ValueError('method must be multires or grid')
+    if kind == 'genetic':
+        seed = data.get('random_seed')
+        params['random_seed'] = _int_param(seed, 'random_seed') if seed is not None else None
+        params['workers'] = _workers_param(data.get('workers', 1))
+        params['persist_cache'] = _bool_param(data.get('persist_cache', False))
+    return params
+
+
+def _run_job(job_id: str, kind: str, params: dict) -> None:
+    try:
+        _run_job_inner(job_id, kind, params)
+    finally:
+        with _LOCAL_JOBS_LOCK:
+            _LOCAL_JOBS.discard(job_id)
+
+
+def _run_job_inner(job_id: str, kind: str, params: dict) -> None:
+    with db_connection(JOBS_DB) as conn:
+        started = conn.execute(
+            "UPDATE jobs SET status = 'running', updated = ?"
+            " WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id),
+        ).rowcount
+    if not started:  # annulé pendant qu'il attendait dans la file
+        return
+
+    last_write = 0.0
+
+    def progress(event):
+        # chaque écriture rafraîchit aussi ``updated`` (battement de cœur)
+        nonlocal last_write
+        now = time.monotonic()
+        done = event['count'] >= event['total']
+        if not done and now - last_write < JOB_PROGRESS_INTERVAL:
+            return
+        last_write = now
+        fraction = min(1.0, event['count'] / event['total'])
+        if event['phase'] in ('primary_progress', 'refine_progress'):
+            # la grille primaire et l'affinage comptent pour moitié chacun
+            fraction = (fraction + (event['phase'] == 'refine_progress')) / 2
+        row = _update_job(job_id, progress=fraction, best=event['best'])
+        if row['cancel_requested']:
+            raise JobCancelled(job_id)
+
+    step = {'weekly': 7, 'monthly': 30}[params['frequency']]
+    try:
+        if kind == 'grid':
+            result = run_search(
+                iter_search_events(
+                    params['method'], params['amount'], params['start'], step
+                ),
+                progress=progress,
+            )
+            best = result['best']
+        else:
+            full, stats = genetic_algorithm(
+                params['amount'], params['start'], params['frequency'],
+                random_seed=params['random_seed'],
+                workers=params['workers'],
+                persist_cache=params['persist_cache'],
+                progress=progress,
+            )
+            result = {'best': full, **stats}
+            best = {k: full[k] for k in (*GA_PARAM_NAMES, 'performance_pct')}
+        _update_job(job_id, status='done', progress=1.0, best=best, result=result)
+        logging.info("Job %s (%s) terminé", job_id, kind)
+    except JobCancelled:
+        _update_job(job_id, status='cancelled')
+        logging.info("Job %s (%s) annulé", job_id, kind)
+    except Exception as exc:
+        logging.error("Job %s (%s) en échec : %s\n%s", job_id, kind, exc, traceback.format_exc())
+        _update_job(job_id, status='failed', error=str(exc))
+
+
+def submit_job(kind: str, params: dict) -> tuple[dict, bool]:
+    """
+    Enregistre et lance un job, ou renvoie le job actif identique.
+
+    Retourne ``(job, deduplicated)``. La clé de déduplication inclut le
+    SHA-1 du CSV de la base, commun à tous les workers.
+    """
+    data_sha1 = get_price_store().csv_sha1
+    key = hashlib.sha1(
+        json.dumps([kind, params, data_sha1], sort_keys=True).encode()
+    ).hexdigest()
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    _ensure_job_heartbeat()
+    try:
+        with db_connection(JOBS_DB) as conn:
+            _expire_jobs(conn)
+            conn.execute(
+                'INSERT INTO jobs (id, kind, key, params, status, created, updated)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, kind, key, json.dumps(params), 'queued', now, now),
+            )
+    except sqlite3.IntegrityError:
+        with db_connection(JOBS_DB) as conn:
+            row = conn.execute(
+                'SELECT * FROM jobs WHERE key = ? AND status IN (?, ?)',
+                (key, *_JOB_ACTIVE),
+            ).fetchone()
+        if row is not None:
+            return _job_to_dict(row), True
+        return submit_job(kind, params)  # le job actif vient de se terminer
+    with _LOCAL_JOBS_LOCK:
+        _LOCAL_JOBS.add(job_id)
+    _JOB_EXECUTOR.submit(_run_job, job_id, kind, params)
+    return get_job(job_id), False
+
+
+def cancel_job(job_id: str) -> dict | None:
+    """Demande l'annulation ; un job encore en file est annulé immédiatement."""
+    with db_connection(JOBS_DB) as conn:
+        conn.execute(
+            "UPDATE jobs SET cancel_requested = 1, updated = ? WHERE id = ?",
+            (time.time(), job_id),
         )
-        yield f"data:{json.dumps({'phase':'primary_start','total':total_primary})}\n\n"
-
-        for high in range(60, 95, 5):
-            for low in range(5, 55, 5):
-                for pct in range(5, 55, 5):
-                    for bmax in range(50, 550, 50):
-                        result = simulate_smart_dca_rows(
-                            rows, step, amount, high, low, pct / 100.0, bmax
-                        )
-                        count_primary += 1
-                        entry = {
-                            'fg_threshold_high': high,
-                            'fg_threshold_low': low,
-                            'bag_bonus_pct': pct,
-                            'bag_bonus_max': bmax,
-                            'performance_pct': result['performance_pct'],
-                        }
-                        if not best or entry['performance_pct'] > best['performance_pct']:
-                            second = best
-                            best = entry
-                        elif not second or entry['performance_pct'] > second['performance_pct']:
-                            second = entry
-                        if count_primary % 100 == 0 or count_primary == total_primary:
-                            payload = {
-                                'phase': 'primary_progress',
-                                'count': count_primary,
-                                'total': total_primary,
-                            }
-                            yield f"data:{json.dumps(payload)}\n\n"
-
-        best_primary = best
-
-        base_high = best['fg_threshold_high']
-        base_low = best['fg_threshold_low']
-        base_pct = best['bag_bonus_pct']
-        base_bmax = best['bag_bonus_max']
-
-        range_high = [h for h in range(base_high - 5, base_high + 6) if 0 <= h <= 100]
-        range_low = [l for l in range(base_low - 5, base_low + 6) if 0 <= l <= 100]
-        range_pct = [p for p in range(base_pct - 5, base_pct + 6) if 0 <= p <= 100]
-        range_bmax = [b for b in range(base_bmax - 50, base_bmax + 51, 10) if b > 0]
-
-        total_refine = (
-            len(range_high) * len(range_low) * len(range_pct) * len(range_bmax)
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'queued'",
+            (job_id,),
         )
-        payload = {
-            'phase': 'primary_end',
-            'best': best_primary,
-            'total_refine': total_refine,
-        }
-        yield f"data:{json.dumps(payload)}\n\n"
-
-        refine_count = 0
-        for high in range_high:
-            for low in range_low:
-                for pct in range_pct:
-                    for bmax in range_bmax:
-                        result = simulate_smart_dca_rows(
-                            rows, step, amount, high, low, pct / 100.0, bmax
-                        )
-                        refine_count += 1
-                        entry = {
-                            'fg_threshold_high': high,
-                            'fg_threshold_low': low,
-                            'bag_bonus_pct': pct,
-                            'bag_bonus_max': bmax,
-                            'performance_pct': result['performance_pct'],
-                        }
-                        if entry['performance_pct'] > best['performance_pct']:
-                            second = best
-                            best = entry
-                        elif (
-                            not second
-                            or entry['performance_pct'] > second['performance_pct']
-                        ):
-                            second = entry
-                        if refine_count % 100 == 0 or refine_count == total_refine:
-                            payload = {
-                                'phase': 'refine_progress',
-                                'count': refine_count,
-                                'total': total_refine,
-                                'best_perf': best['performance_pct'],
-                            }
-                            yield f"data:{json.dumps(payload)}\n\n"
-
-        payload = {
-            'phase': 'finish',
-            'tested_phase1': count_primary,
-            'tested_phase2': refine_count,
-            'best': best,
-        }
-        yield f"data:{json.dumps(payload)}\n\n"
+    return get_job(job_id)
 
-    return Response(stream_with_context(gen()), mimetype='text/event-stream')
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Submit a grid or genetic optimization as a background job."""
+    data = request.get_json() or {}
+    logging.info("/api/jobs params: %s", data)
+    try:
+        params = _job_params(data)
+    except (TypeError, ValueError) as exc:
+        return jsonify({'error': str(exc)}), 400
+    job, deduplicated = submit_job(data['kind'], params)
+    return jsonify({**job, 'deduplicated': deduplicated}), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Return the status, progress and partial best of a job."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id):
+    """Cancel a queued or running job."""
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({'error': 'job not found'}), 404
+    return jsonify(job)
 
 
 @app.route('/reset-db', methods=['POST'])
@@ -1095,11 +2870,10 @@ def _selftest():
     high, low, pct, bmax = 21, 20, 100, 233
 
     # --- appel « manuel » ---
-    conn = get_db_connection()
-    rows = conn.execute(
-        "SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date", (start,)
-    ).fetchall()
-    conn.close()
+    with db_connection() as conn:
+        rows = conn.execute(
+            "SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date", (start,)
+        ).fetchall()
     step = {"weekly": 7, "monthly": 30}[freq]
     manual = simulate_smart_dca_rows(
         rows, step, amount, high, low, pct / 100, bmax )
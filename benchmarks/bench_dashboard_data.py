@@ -0,0 +1,106 @@
+"""Sérialisation de ``history`` dans strategy-dashboard/generate_data.py.
+
+Compare, sur des historiques synthétiques 1×, 10× et 100× plus longs que
+l'historique MSTR actuel (~1500 séances), l'ancienne boucle ``itertuples``
+(un dict et six ``round(float(...))`` par ligne) aux colonnes arrondies
+directement depuis le DataFrame, écrites en lignes ou en colonnes :
+temps de génération (colonnes + ``json.dumps``) et taille brute / gzip.
+
+    python benchmarks/bench_dashboard_data.py [--scales 1,10,100] [--repeat 5]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "strategy-dashboard"))
+
+import generate_data as gd  # noqa: E402
+
+BASE_SESSIONS = 1500
+
+
+def make_merged(sessions: int, seed: int = 0) -> pd.DataFrame:
+    # Cours oscillant autour des ordres de grandeur réels : une marche
+    # aléatoire sur 150 000 séances atteindrait des valeurs irréalistes.
+    rng = np.random.default_rng(seed)
+    phase = np.arange(sessions) / 400
+    merged = pd.DataFrame({
+        "date": pd.date_range("1700-01-01", periods=sessions, freq="D"),
+        "mstr": 150 * np.exp(np.sin(phase) + rng.normal(0, 0.04, sessions)),
+        "btc": 40000 * np.exp(np.cos(phase) + rng.normal(0, 0.03, sessions)),
+        "bps": np.repeat(rng.uniform(50000, 250000, sessions // 60 + 1), 60)[:sessions],
+    })
+    merged["marketShares"] = merged["btc"] / merged["mstr"]
+    merged["backingShares"] = gd.SATS / merged["bps"]
+    merged["multiple"] = merged["backingShares"] / merged["marketShares"]
+    return merged
+
+
+def legacy_rows(merged):
+    history = []
+    for row in merged.itertuples(index=False):
+        history.append({
+            "date": row.date.date().isoformat(),
+            "mstr": round(float(row.mstr), 4),
+            "btc": round(float(row.btc), 2),
+            "bps": round(float(row.bps), 2),
+            "marketShares": round(float(row.marketShares), 4),
+            "backingShares": round(float(row.backingShares), 4),
+            "multiple": round(float(row.multiple), 5),
+        })
+    return history
+
+
+VARIANTS = {
+    "itertuples rows": legacy_rows,
+    "vectorized rows": lambda m: gd.columns_to_rows(gd.history_columns(m)),
+    "columnar": gd.history_columns,
+}
+
+
+def dump(history):
+    return json.dumps({"history": history}, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'sessions':>8}  {'variant':<16} {'build ms':>9} {'dumps ms':>9} "
+          f"{'total ms':>9} {'size KB':>9} {'gzip KB':>8}")
+    for scale in (int(s) for s in args.scales.split(",")):
+        merged = make_merged(BASE_SESSIONS * scale)
+        reference = None
+        for name, build in VARIANTS.items():
+            build_s, history = best_of(lambda: build(merged), args.repeat)
+            dumps_s, body = best_of(lambda: dump(history), args.repeat)
+            rows = gd.columns_to_rows(history) if isinstance(history, dict) else history
+            if reference is None:
+                reference = rows
+            elif rows != reference:
+                raise SystemExit(f"{name}: history differs from the itertuples output")
+            print(f"{scale:>5} {len(merged):>8}  {name:<16} {build_s * 1e3:>9.1f} {dumps_s * 1e3:>9.1f} "
+                  f"{(build_s + dumps_s) * 1e3:>9.1f} {len(body) / 1024:>9.0f} "
+                  f"{len(gzip.compress(body)) / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Latence des lectures SQLite sous charge concurrente.
+
+Compare, pour les requêtes de /api/data (une date) et /api/chart-data
+(table complète), l'ancien schéma « connexion ouverte puis fermée à chaque
+requête » et le pool par thread ``app.db_connection`` (WAL, mmap, requêtes
+préparées en cache). Mesure aussi les deux endpoints via le client de test
+Flask, servis depuis l'instantané en mémoire.
+
+    python benchmarks/bench_db_access.py [--threads 1,4,8] [--requests 2000]
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("RENDER", "1")
+
+import app  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+DAY_SQL = "SELECT price, fg FROM data WHERE date=?"
+CHART_SQL = "SELECT date, price, fg FROM data ORDER BY date"
+
+
+def fresh_query(sql, params=()):
+    conn = sqlite3.connect(app.DB_NAME)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(sql, params).fetchall()
+    conn.close()
+    return rows
+
+
+def pooled_query(sql, params=()):
+    with app.db_connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def measure(fn, n_requests, n_threads):
+    """Latences individuelles (ms) de ``n_requests`` appels sur ``n_threads``."""
+    def timed(_):
+        t0 = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t0) * 1000
+
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        list(pool.map(timed, range(n_threads * 4)))  # chauffe des connexions
+        t0 = time.perf_counter()
+        lat = list(pool.map(timed, range(n_requests)))
+        wall = time.perf_counter() - t0
+    lat.sort()
+    return {
+        "mean": statistics.fmean(lat),
+        "p95": lat[int(len(lat) * 0.95) - 1],
+        "rps": n_requests / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", default="1,4,8")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    dates = app.get_price_store().dates.tolist()
+    client = app.app.test_client()
+    cases = {
+        "data sql/fresh": lambda: fresh_query(DAY_SQL, (random.choice(dates),)),
+        "data sql/pool": lambda: pooled_query(DAY_SQL, (random.choice(dates),)),
+        "chart sql/fresh": lambda: fresh_query(CHART_SQL),
+        "chart sql/pool": lambda: pooled_query(CHART_SQL),
+        "GET /api/data": lambda: client.get(f"/api/data?date={random.choice(dates)}"),
+        "GET /api/chart-data": lambda: client.get("/api/chart-data"),
+    }
+    print(f"{'case':<22} {'threads':>7} {'mean ms':>8} {'p95 ms':>8} {'req/s':>8}")
+    for n_threads in (int(t) for t in args.threads.split(",")):
+        for name, fn in cases.items():
+            n = args.requests if "chart" not in name else args.requests // 10
+            r = measure(fn, n, n_threads)
+            print(f"{name:<22} {n_threads:>7} {r['mean']:>8.3f} {r['p95']:>8.3f} {r['rps']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
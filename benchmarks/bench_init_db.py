@@ -0,0 +1,114 @@
+"""Mesure du démarrage à froid d'un worker (import de app.py → init_db).
+
+Génère des CSV synthétiques 1×, 10× et 100× plus longs que data.csv (les
+dates sont décalées vers le passé pour rester uniques), puis importe
+``app`` dans un sous-processus neuf pour chacun, comme un worker gunicorn :
+une fois sans base (construction) et une fois avec la base déjà construite
+pour ce CSV (réutilisation par les workers suivants).
+
+    python benchmarks/bench_init_db.py [--scales 1,10,100] [--repeat 3]
+"""
+import argparse
+import datetime
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_CSV = os.path.join(ROOT, "data.csv")
+
+BUILD_RE = re.compile(
+    r"(\d+) lignes en ([\d.]+)s \(CSV ([\d.]+)s, insertion ([\d.]+)s, snapshot ([\d.]+)s\)"
+)
+ATTACH_RE = re.compile(r"(\d+) lignes chargées en ([\d.]+)s \(snapshot ([\d.]+)s\)")
+
+
+def make_csv(scale: int, path: str) -> int:
+    """Écrit un CSV ``scale`` fois plus long que data.csv, au même format.
+
+    Les copies supplémentaires reçoivent des jours consécutifs précédant la
+    première date réelle (dates construites avec ``datetime`` car 100× la
+    période dépasse la plage des timestamps nanoseconde).
+    """
+    df = pd.read_csv(SOURCE_CSV, dtype=str)
+    extra = len(df) * (scale - 1)
+    if extra:
+        first = datetime.datetime.strptime(df["Date"].iloc[0], "%d.%m.%Y").date()
+        days = [first - datetime.timedelta(days=extra - i) for i in range(extra)]
+        filler = pd.DataFrame({
+            "Date": [d.strftime("%d.%m.%Y") for d in days],
+            "Jour Mois": [str(d.day) for d in days],
+            "Jour Semaine": df["Jour Semaine"].iloc[0],
+            "Price": np.resize(df["Price"].to_numpy(), extra),
+            "Fear and Greed": np.resize(df["Fear and Greed"].to_numpy(), extra),
+        })
+        df = pd.concat([filler, df], ignore_index=True)
+    df.to_csv(path, index=False)
+    return len(df)
+
+
+def cold_start(csv_path: str, db_path: str, fresh: bool) -> dict:
+    """Importe app dans un processus neuf et relève le rapport d'init_db."""
+    if fresh and os.path.exists(db_path):
+        os.remove(db_path)
+    env = dict(os.environ, BTC_CSV_FILE=csv_path, BTC_DB_NAME=db_path, RENDER="1")
+    code = "import time; t=time.perf_counter(); import app; print('IMPORT', time.perf_counter()-t)"
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    wall = time.perf_counter() - t0
+    imp = float(proc.stdout.split("IMPORT")[-1])
+    build = BUILD_RE.search(proc.stderr)
+    attach = ATTACH_RE.search(proc.stderr)
+    if build:
+        rows, init, csv, insert, snapshot = build.groups()
+    elif attach:
+        rows, init, snapshot = attach.groups()
+        csv = insert = 0
+    else:
+        raise RuntimeError("rapport init_db introuvable :\n" + proc.stderr)
+    return {
+        "mode": "build" if build else "attach",
+        "rows": int(rows),
+        "init_db": float(init),
+        "csv": float(csv),
+        "insert": float(insert),
+        "snapshot": float(snapshot),
+        "import": imp,
+        "process": wall,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>5} {'mode':>6} {'rows':>8} {'init_db':>8} {'csv':>7} "
+          f"{'insert':>7} {'snapshot':>8} {'import':>7} {'process':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            csv_path = os.path.join(tmp, f"data_x{scale}.csv")
+            make_csv(scale, csv_path)
+            db_path = os.path.join(tmp, f"btc_x{scale}.db")
+            for fresh in (True, False):
+                runs = [cold_start(csv_path, db_path, fresh)
+                        for _ in range(args.repeat)]
+                best = min(runs, key=lambda r: r["process"])
+                print(f"{scale:>4}× {best['mode']:>6} {best['rows']:>8} "
+                      f"{best['init_db']:>7.3f}s {best['csv']:>6.3f}s "
+                      f"{best['insert']:>6.3f}s {best['snapshot']:>7.3f}s "
+                      f"{best['import']:>6.3f}s {best['process']:>7.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Backfill Google Trends de bout en bout, hors ligne (StubTrendsBackend).
+
+Pour chaque taux de 429 simulé, mesure le remplissage complet de la période
+``all`` sur une base vide (téléchargement, raccord, enregistrement), puis
+le rafraîchissement incrémental quand seuls les derniers jours manquent.
+Latence et attentes (pause entre fenêtres, backoff ``2 ** attempt``) sont
+simulées : ``--time-scale`` fixe la part réellement dormie, le temps
+« simulé » ajoute le reste.
+
+    python benchmarks/bench_trends_backfill.py [--latency 0.3] [--error-rates 0,0.1,0.3]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+TMP = tempfile.mkdtemp(prefix="bench_trends_")
+os.environ["BTC_DB_NAME"] = os.path.join(TMP, "btc.db")
+os.environ.setdefault("RENDER", "1")  # pas de thread de tendances au démarrage
+
+import app  # noqa: E402
+
+logging.getLogger().setLevel(logging.WARNING)
+
+
+def reset_trends():
+    with app.db_connection() as conn:
+        conn.execute("DELETE FROM trends")
+        conn.execute("DELETE FROM trend_fetches")
+
+
+def run(backend, start, end):
+    app.set_trends_backend(backend)
+    before = (backend.requests, backend.rate_limited, backend.slept)
+    t0 = time.perf_counter()
+    try:
+        app.ensure_trends_fetched(start, end)
+        error = ""
+    except app.TrendsRateLimited as exc:
+        error = str(exc)
+    wall = time.perf_counter() - t0
+    slept = backend.slept - before[2]
+    return {
+        "requests": backend.requests - before[0],
+        "429": backend.rate_limited - before[1],
+        "slept": slept,
+        "wall": wall,
+        # part des attentes non dormies réellement ajoutée au temps mesuré
+        "simulated": wall + slept * (1 - backend.time_scale),
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="latence simulée par requête (s)")
+    parser.add_argument("--error-rates", default="0,0.1,0.3")
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="fraction des attentes réellement dormie")
+    parser.add_argument("--fixture", help="CSV date,score servi par le stub")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = date.today()
+    print(f"{'scenario':<12} {'429 rate':>8} {'requests':>8} {'429s':>5} "
+          f"{'slept s':>8} {'wall s':>7} {'simulated s':>11}  error")
+    for rate in (float(r) for r in args.error_rates.split(",")):
+        backend = app.StubTrendsBackend(
+            fixture=args.fixture, latency=args.latency, error_rate=rate,
+            time_scale=args.time_scale, seed=args.seed,
+        )
+        for name in ("cold all", "last 3 days"):
+            if name == "cold all":
+                reset_trends()
+            else:  # seuls les derniers jours manquent
+                with app.db_connection() as conn:
+                    conn.execute("DELETE FROM trends WHERE date >= ?",
+                                 ((today - timedelta(days=2)).isoformat(),))
+                    conn.execute("DELETE FROM trend_fetches")
+            r = run(backend, app.TREND_ALL_START, today)
+            print(f"{name:<12} {rate:>8.2f} {r['requests']:>8} {r['429']:>5} "
+                  f"{r['slept']:>8.1f} {r['wall']:>7.2f} {r['simulated']:>11.1f}  {r['error']}")
+
+
+if __name__ == "__main__":
+    main()
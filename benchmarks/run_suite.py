@@ -0,0 +1,221 @@
+"""Suite de benchmarks des calculs de l'application, résultats en JSON.
+
+Chaque jeu de données (data.csv puis des copies synthétiques 10× et 100×
+plus longues, voir ``bench_init_db.make_csv``) est mesuré dans un processus
+neuf qui importe ``app`` avec sa propre base. Toutes les mesures partent de
+la première date disponible, pour que la longueur de la série suive
+l'échelle :
+
+- ``simulate_smart_dca_rows`` (mensuel, paramètres de ``_selftest``) ;
+- ``genetic_algorithm`` à graine fixe (population et générations réduites) ;
+- la recherche par grille de ``/api/optimize-smart-dca`` (``method: grid``) ;
+- ``/api/dca`` quotidien, ``/api/best-days`` et ``/api/chart-data`` (cache
+  de réponses vidé, puis servi depuis le cache) via le client de test Flask.
+
+Le fichier JSON produit (commit, versions, min/médiane par cas et résultat
+calculé) se compare à celui d'un autre commit avec ``--compare`` :
+
+    python benchmarks/run_suite.py [--scales 1,10,100] [--repeat 3] [--cases dca_daily,grid]
+        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+AMOUNT = 100
+# paramètres de _selftest : seuils FGI haut/bas, % du bag, plafond du bonus
+SMART_PARAMS = (21, 20, 100, 233)
+GA_OPTIONS = {"pop_size": 32, "n_gen": 15, "stagnation_patience": 15, "random_seed": 42}
+
+
+def cases(app):
+    """Cas mesurés : nom -> fonction sans argument renvoyant un résumé du résultat."""
+    start = app.get_date_range()[0]
+    client = app.app.test_client()
+    high, low, pct, bonus_max = SMART_PARAMS
+
+    def post(url, payload):
+        response = client.post(url, json=payload)
+        assert response.status_code == 200, response.get_data(as_text=True)[:200]
+        return response
+
+    def smart_rows():
+        with app.db_connection() as conn:
+            rows = conn.execute(
+                "SELECT date, price, fg FROM data WHERE date >= ? ORDER BY date", (start,)
+            ).fetchall()
+        res = app.simulate_smart_dca_rows(rows, 30, AMOUNT, high, low, pct / 100, bonus_max)
+        return round(res["performance_pct"], 6)
+
+    def genetic():
+        best, _ = app.genetic_algorithm(AMOUNT, start, "monthly", **GA_OPTIONS)
+        return {k: (round(v, 6) if isinstance(v, float) else v) for k, v in best.items()}
+
+    def grid():
+        res = post("/api/optimize-smart-dca", {
+            "amount": AMOUNT, "start": start, "frequency": "monthly", "method": "grid",
+        }).get_json()
+        return {"tested": res["tested"], "best": res["best"]}
+
+    def dca_daily():
+        res = post("/api/dca", {"amount": AMOUNT, "start": start, "frequency": "daily"}).get_json()
+        return round(res["performance_pct"], 6)
+
+    def best_days():
+        res = post("/api/best-days", {"amount": AMOUNT, "start": start}).get_json()
+        return len(res)
+
+    def chart_data(cached):
+        def run():
+            if not cached:
+                app._RESPONSE_CACHE.clear()
+            response = client.get("/api/chart-data")
+            assert response.status_code == 200
+            return len(response.get_data())
+        return run
+
+    return {
+        "simulate_smart_dca_rows": smart_rows,
+        "genetic_algorithm": genetic,
+        "grid": grid,
+        "dca_daily": dca_daily,
+        "best_days": best_days,
+        "chart_data": chart_data(cached=False),
+        "chart_data_cached": chart_data(cached=True),
+    }
+
+
+def run_worker(repeat, selected, output):
+    """Exécuté dans le sous-processus : mesure les cas et écrit le JSON dans ``output``."""
+    import logging
+
+    import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    for name, fn in cases(app).items():
+        if selected and name not in selected:
+            continue
+        fn()  # chauffe : instantané, caches NumPy, compilation éventuelle
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            value = fn()
+            times.append(time.perf_counter() - t0)
+        results[name] = {
+            "min": min(times),
+            "median": statistics.median(times),
+            "runs": times,
+            "result": value,
+        }
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump({"rows": len(app.get_price_store()), "cases": results}, fh)
+
+
+def run_scale(scale, tmp, repeat, selected):
+    from bench_init_db import make_csv
+
+    csv_path = os.path.join(tmp, f"data_x{scale}.csv")
+    make_csv(scale, csv_path)
+    env = dict(
+        os.environ,
+        BTC_CSV_FILE=csv_path,
+        BTC_DB_NAME=os.path.join(tmp, f"btc_x{scale}.db"),
+        RENDER="1",
+    )
+    output = os.path.join(tmp, f"results_x{scale}.json")
+    cmd = [
+        sys.executable, os.path.abspath(__file__),
+        "--worker", "--repeat", str(repeat), "--output", output,
+    ]
+    if selected:
+        cmd += ["--cases", ",".join(selected)]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"échelle {scale}× :\n{proc.stderr}")
+    with open(output, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline):
+    print(f"\n{'scale':>5}  {'case':<24} {'baseline':>10} {'current':>10} {'change':>8}  result")
+    for scale, data in current["scales"].items():
+        old = baseline.get("scales", {}).get(scale, {}).get("cases", {})
+        for name, case in data["cases"].items():
+            if name not in old:
+                continue
+            before, after = old[name]["min"], case["min"]
+            same = "same" if old[name]["result"] == case["result"] else "DIFFERS"
+            print(f"{scale:>4}×  {name:<24} {before * 1e3:>8.1f}ms {after * 1e3:>8.1f}ms "
+                  f"{(after / before - 1) * 100:>+7.1f}%  {same}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--cases", default="", help="cas à mesurer, séparés par des virgules")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--compare", help="JSON d'un précédent lancement")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    selected = [c for c in args.cases.split(",") if c]
+
+    if args.worker:
+        run_worker(args.repeat, selected, args.output)
+        return
+
+    import numpy as np
+    import pandas as pd
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "ga_options": GA_OPTIONS,
+        "scales": {},
+    }
+    print(f"{'scale':>5} {'rows':>8}  {'case':<24} {'min':>10} {'median':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in (int(s) for s in args.scales.split(",")):
+            data = run_scale(scale, tmp, args.repeat, selected)
+            report["scales"][str(scale)] = data
+            for name, case in data["cases"].items():
+                print(f"{scale:>4}× {data['rows']:>8}  {name:<24} "
+                      f"{case['min'] * 1e3:>8.1f}ms {case['median'] * 1e3:>8.1f}ms")
+
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nRésultats écrits dans {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            compare(report, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
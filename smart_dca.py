@@ -0,0 +1,225 @@
+"""
+Moteur vectorisé du DCA « Fear & Greed » et workers du pool du GA.
+
+Module sans effet de bord à l'import (pas de base, pas de thread) : les
+processus du pool de :func:`app.genetic_algorithm` n'importent que lui, et
+non ``app`` avec son ``init_db``, ses jobs et ses téléchargements Trends.
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# (fg_high, fg_low, bag_pct, bag_max), voir app.PARAM_BOUNDS
+N_PARAMS = 4
+
+
+def _invalid_smart_dca_result():
+    return {
+        'performance_pct': -9999,
+        'total_invested': 0,
+        'btc_total': 0,
+        'final_value': 0,
+        'bag_used': 0,
+        'bag_remaining': 0,
+    }
+
+
+def simulate_smart_dca_arrays(prices, fgs, last_price, amount, high, low, pct, bonus_max):
+    """
+    Moteur vectorisé du DCA « Fear & Greed ».
+
+    prices / fgs : tableaux NumPy déjà échantillonnés au pas d'achat
+                   (voir :func:`smart_dca_arrays`)
+    last_price   : dernier prix de la période, pour la valorisation finale
+    Les autres paramètres sont ceux de :func:`simulate_smart_dca_rows`.
+
+    Seul le bag dépend du chemin parcouru : on ne boucle donc que sur les
+    jours où il évolue (FGI >= high ou <= low), le reste est calculé en
+    une passe sur les tableaux.
+    """
+
+    # Stratégies incohérentes → score très bas
+    if high < low or not (0 < pct <= 1) or bonus_max < 1:
+        return _invalid_smart_dca_result()
+
+    n = len(prices)
+    to_bag = fgs >= high               # sentiment élevé → on réserve dans le bag
+    from_bag = ~to_bag & (fgs <= low)  # sentiment bas → on puise dans le bag
+    invest = np.where(to_bag, 0.0, float(amount))
+
+    bag = bag_used = 0.0
+    max_bag = 12 * amount              # bag plafonné à 1 an de DCA
+    events = np.flatnonzero(to_bag | from_bag)
+    if len(events):
+        bonus_idx = []
+        bonuses = []
+        for i, is_bag in zip(events.tolist(), to_bag[events].tolist()):
+            if is_bag:
+                bag = min(bag + amount, max_bag)
+            else:
+                bonus = min(bag * pct, bonus_max, bag)
+                bag -= bonus
+                bag_used += bonus
+                bonus_idx.append(i)
+                bonuses.append(bonus)
+        if bonus_idx:
+            invest[bonus_idx] += bonuses
+
+    # Achat réel de BTC
+    bought = invest > 0
+    btc_total = float(np.sum(invest[bought] / prices[bought]))
+    invested = float(np.sum(invest[bought]))
+
+    # Valeur finale et performance
+    final_value = btc_total * last_price if n else 0
+    total_engaged = invested + bag      # tout ce qui a été sorti du portefeuille
+    performance = (
+        (final_value + bag - total_engaged) / total_engaged * 100
+        if total_engaged else 0
+    )
+
+    return {
+        'performance_pct': performance,
+        'total_invested': invested,
+        'btc_total': btc_total,
+        'final_value': final_value,
+        'bag_used': bag_used,
+        'bag_remaining': bag,
+    }
+
+
+_BATCH_CELLS = 4_000_000  # taille max d'une matrice dates × candidats
+
+
+def simulate_smart_dca_batch(prices, fgs, last_price, amount, params):
+    """
+    Évalue N jeux de paramètres en une seule passe sur les dates d'achat.
+
+    params : tableau (N, 4) de ``(fg_high, fg_low, bag_pct, bag_max)`` où
+             ``bag_pct`` est exprimé en pourcents (1–100) comme dans les
+             chromosomes du GA.
+
+    Les N bags avancent ensemble, une date à la fois, avec des opérations
+    sur tableaux. Retourne le vecteur des ``performance_pct`` (N,), avec
+    -9999 pour les stratégies incohérentes, identique à
+    :func:`simulate_smart_dca_arrays` appelé N fois.
+    """
+    params = np.asarray(params, dtype=np.float64).reshape(-1, N_PARAMS)
+    performance = np.full(len(params), -9999.0)
+    valid = (
+        (params[:, 0] >= params[:, 1])
+        & (params[:, 2] > 0) & (params[:, 2] <= 100)
+        & (params[:, 3] >= 1)
+    )
+    if not valid.any() or not len(prices):
+        performance[valid] = 0.0
+        return performance
+
+    idx = np.flatnonzero(valid)
+    if amount < 0:
+        # Montant négatif (entrée incohérente) : le bag devient négatif et
+        # sort des hypothèses du moteur par lots, on garde le séquentiel.
+        performance[idx] = [
+            simulate_smart_dca_arrays(
+                prices, fgs, last_price, amount, high, low, pct / 100.0, bonus_max
+            )['performance_pct']
+            for high, low, pct, bonus_max in params[idx].tolist()
+        ]
+        return performance
+
+    # Les FGI ne prennent qu'une centaine de valeurs : chaque date est
+    # ramenée à l'indice de sa valeur, une fois pour tous les blocs.
+    levels, codes = np.unique(fgs, return_inverse=True)
+
+    # Les candidats incohérents ne sont jamais simulés ; on découpe le reste
+    # en blocs pour borner la taille des matrices (dates × candidats).
+    block = max(1, _BATCH_CELLS // len(prices))
+    for lo in range(0, len(idx), block):
+        sel = idx[lo:lo + block]
+        performance[sel] = _smart_dca_block(
+            prices, levels, codes, last_price, amount, params[sel]
+        )
+    return performance
+
+
+def _smart_dca_block(prices, levels, codes, last_price, amount, params):
+    """
+    Cœur de :func:`simulate_smart_dca_batch` pour des candidats valides.
+
+    ``levels`` sont les valeurs distinctes du FGI et ``codes`` l'indice de
+    la valeur de chaque date d'achat (``levels[codes] == fgs``).
+    """
+    high, low = params[:, 0], params[:, 1]
+    pct = params[:, 2] / 100.0
+    bonus_max = params[:, 3]
+    amount = float(amount)
+
+    # Action de chaque candidat pour chaque valeur du FGI (et non chaque
+    # date). Le mouvement du bag s'écrit max(bag * scale, floor) :
+    #   - dépôt    : scale = -0,   floor = amount     → +amount ;
+    #   - ponction : scale = -pct, floor = -bonus_max → -min(bag*pct, bonus_max) ;
+    #   - rien     : scale = -0,   floor = 0          → 0.
+    # Chaque cas redonne exactement les flottants du moteur séquentiel
+    # (négation et bag * ±0.0 sont exactes, bag >= 0).
+    deposit = levels[:, None] >= high
+    draw = ~deposit & (levels[:, None] <= low)
+    scale = list(draw * -pct)
+    floor = list(np.where(deposit, amount, draw * -bonus_max))
+
+    # Seul le bag dépend du chemin : on n'avance que les dates où au moins
+    # un candidat le remplit ou le vide, avec quatre opérations NumPy par
+    # date (sorties positionnelles ; fmax/fmin car il n'y a pas de NaN).
+    active = (deposit | draw).any(axis=1)[codes]
+    events = slice(None) if active.all() else np.flatnonzero(active)
+    event_codes = codes[events]
+    flow = np.empty((len(event_codes), len(params)))
+    bag = np.zeros(len(params))
+    max_bag = np.full(len(params), 12 * amount)
+    multiply, fmax, fmin = np.multiply, np.fmax, np.fmin
+    for code, w in zip(event_codes.tolist(), flow):
+        multiply(bag, scale[code], w)
+        fmax(w, floor[code], w)
+        bag += w
+        fmin(bag, max_bag, bag)   # plafond, neutre hors dépôts
+
+    # Mise de chaque date : amount - flow, soit 0 les jours de dépôt et
+    # amount + bonus les jours de ponction.
+    if isinstance(events, slice):
+        invest = np.subtract(amount, flow, out=flow)
+    else:
+        invest = np.full((len(codes), len(params)), amount)
+        invest[events] -= flow
+    np.maximum(invest, 0.0, out=invest)
+    invested = invest.sum(axis=0)
+    btc_total = np.divide(invest, prices[:, None], out=invest).sum(axis=0)
+
+    final_value = btc_total * last_price
+    total_engaged = invested + bag
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(
+            total_engaged != 0,
+            (final_value + bag - total_engaged) / total_engaged * 100,
+            0.0,
+        )
+
+
+# État des processus du pool GA (rempli par ga_pool_init)
+_GA_SHARED: dict = {}
+
+
+def ga_pool_init(shm_name, n, last_price, amount):
+    """Initialiseur des workers : attache les prix/FGI en mémoire partagée."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = np.ndarray((2, n), dtype=np.float64, buffer=shm.buf)
+    _GA_SHARED.update(
+        shm=shm, prices=data[0], fgs=data[1],
+        last_price=last_price, amount=amount,
+    )
+
+
+def ga_pool_evaluate(pop):
+    """Score d'une part de la population, dans un worker du pool."""
+    s = _GA_SHARED
+    return simulate_smart_dca_batch(
+        s['prices'], s['fgs'], s['last_price'], s['amount'], pop
+    )
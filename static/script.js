@@ -1,4 +1,6 @@
 let smartDiv;
+// Points envoyés par le serveur pour les courbes (sous-échantillonnage LTTB)
+const MAX_CHART_POINTS = 1000;
 
 document.addEventListener('DOMContentLoaded', () => {
     const form = document.getElementById('dca-form');
@@ -264,7 +266,7 @@ document.addEventListener('DOMContentLoaded', () => {
         const res = await fetch('/api/dca', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ amount, start, frequency: freq })
+            body: JSON.stringify({ amount, start, frequency: freq, max_points: MAX_CHART_POINTS })
         });
         const data = await res.json();
         displayResults(data);
@@ -277,7 +279,7 @@ document.addEventListener('DOMContentLoaded', () => {
         calcBtn.disabled = false;
     });
 
-    fetch('/api/chart-data')
+    fetch(`/api/chart-data?max_points=${MAX_CHART_POINTS}`)
         .then(r => r.json())
         .then(drawCharts);
 
@@ -350,6 +352,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }else if(data.phase === 'primary_end'){
                 phase1Best = data.best;
                 if(optStatus) optStatus.innerHTML = `Raffinement autour du minimum trouvé...<br>Test 0 / ${data.total_refine} \u2013 meilleure perf : ${data.best.performance_pct.toFixed(2)} %`;
+            }else if(data.phase === 'level_progress'){
+                if(optStatus) optStatus.innerHTML = `Niveau ${data.count} / ${data.total} \u2013 ${data.tested} tests \u2013 meilleure perf : ${data.best_perf.toFixed(2)} %`;
             }else if(data.phase === 'refine_progress'){
                 if(optStatus) optStatus.innerHTML = `Raffinement autour du minimum trouvé...<br>Test ${data.count} / ${data.total} \u2013 meilleure perf : ${data.best_perf.toFixed(2)} %`;
             }else if(data.phase === 'finish'){
@@ -1,16 +1,36 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
 import json
+from bisect import bisect_left
+from itertools import groupby
 from datetime import datetime, timezone
 from pathlib import Path
 
 import pandas as pd
 import requests
-import yfinance as yf
 
 ROOT = Path(__file__).resolve().parent
 OUT = ROOT / "data.json"
+SHARDS_DIR = ROOT / "data"
 SATS = 100_000_000
+HISTORY_START = "2020-08-10"
+# Séances déjà publiées re-téléchargées en mode incrémental : la dernière
+# clôture BTC-USD du jour est partielle au moment du cron.
+REFRESH_OVERLAP_DAYS = 7
+# Décimales publiées pour chaque colonne de ``history``.
+HISTORY_DECIMALS = {
+    "mstr": 4,
+    "btc": 2,
+    "bps": 2,
+    "marketShares": 4,
+    "backingShares": 4,
+    "multiple": 5,
+}
+HISTORY_FIELDS = ["date", *HISTORY_DECIMALS]
+# Périodes pandas des séries agrégées servies aux vues longues.
+AGGREGATES = {"weekly": "W", "monthly": "M"}
 
 # Points officiels publiés par Strategy. Les actions sont ajustées du split 10:1.
 DISCLOSURES = [
@@ -54,14 +74,7 @@ def disclosure_rows():
     return rows
 
 
-def fetch_live_bps():
-    response = requests.get(
-        "https://api.strategy.com/btc/bitcoinKpis",
-        headers=HEADERS,
-        timeout=20,
-    )
-    response.raise_for_status()
-    payload = response.json()
+def parse_kpis(payload):
     results = payload.get("results", {})
     bps = to_number(results.get("satsPerShare"))
     holdings = to_number(results.get("btcHoldings"))
@@ -76,26 +89,228 @@ def fetch_live_bps():
     }
 
 
-def close_series(symbol: str):
+def fetch_live_bps():
+    response = requests.get(
+        "https://api.strategy.com/btc/bitcoinKpis",
+        headers=HEADERS,
+        timeout=20,
+    )
+    response.raise_for_status()
+    return parse_kpis(response.json())
+
+
+def clean_close(values, symbol: str):
+    series = pd.to_numeric(values, errors="coerce").dropna()
+    series.index = pd.to_datetime(series.index).tz_localize(None).normalize()
+    series.name = symbol
+    return series
+
+
+def close_series(symbol: str, start: str = HISTORY_START):
+    import yfinance as yf
+
     frame = yf.Ticker(symbol).history(
-        start="2020-08-10",
+        start=start,
         interval="1d",
         auto_adjust=True,
         actions=False,
     )
     if frame.empty or "Close" not in frame:
         raise RuntimeError(f"No market history returned for {symbol}")
-    series = pd.to_numeric(frame["Close"], errors="coerce").dropna()
-    series.index = pd.to_datetime(series.index).tz_localize(None).normalize()
-    series.name = symbol
-    return series
+    return clean_close(frame["Close"], symbol)
+
+
+class LiveSource:
+    """Cours Yahoo Finance et BPS live de l'API Strategy."""
+
+    def close_series(self, symbol: str, start: str = HISTORY_START):
+        return close_series(symbol, start)
+
+    def live_bps(self):
+        return fetch_live_bps()
+
+
+class FixtureSource:
+    """Mêmes données lues dans un dossier local, pour travailler hors ligne.
+
+    Le dossier contient ``<SYMBOL>.csv`` (colonnes ``date,close``) pour MSTR et
+    BTC-USD, et optionnellement ``bitcoinKpis.json`` (réponse brute de l'API).
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def close_series(self, symbol: str, start: str = HISTORY_START):
+        frame = pd.read_csv(self.directory / f"{symbol}.csv", index_col="date")
+        series = clean_close(frame["close"], symbol)
+        series = series[series.index >= pd.Timestamp(start)]
+        if series.empty:
+            raise RuntimeError(f"No market history returned for {symbol}")
+        return series
+
+    def live_bps(self):
+        path = self.directory / "bitcoinKpis.json"
+        if not path.exists():
+            raise RuntimeError(f"No Strategy KPI fixture in {self.directory}")
+        return parse_kpis(json.loads(path.read_text(encoding="utf-8")))
+
+
+def market_prices(source, start: str = HISTORY_START):
+    mstr = source.close_series("MSTR", start)
+    btc = source.close_series("BTC-USD", start)
+    prices = pd.concat([mstr, btc], axis=1).sort_index()
+    prices["BTC-USD"] = prices["BTC-USD"].ffill()
+    prices = prices.dropna(subset=["MSTR", "BTC-USD"]).reset_index()
+    prices.columns = ["date", "mstr", "btc"]
+    return prices
 
 
-def main():
+def load_previous(path: Path):
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if not payload.get("history"):
+        return None
+    if isinstance(payload["history"], list):
+        payload["history"] = rows_to_columns(payload["history"])
+    return payload
+
+
+def first_changed_disclosure(previous, disclosures):
+    """Date du plus ancien point BPS ajouté, modifié ou retiré depuis ``previous``."""
+    def points(rows):
+        return {(x["date"], round(float(x["bps"]), 2)) for x in rows}
+
+    changed = points(previous) ^ points(disclosures)
+    return min(day for day, _ in changed) if changed else None
+
+
+def history_columns(merged):
+    columns = {"date": merged["date"].dt.strftime("%Y-%m-%d").tolist()}
+    for field, decimals in HISTORY_DECIMALS.items():
+        columns[field] = merged[field].astype(float).round(decimals).tolist()
+    return columns
+
+
+def aggregate_columns(history, freq: str):
+    """Clôture de chaque champ par période, plus ouverture/plus haut/plus bas du multiple.
+
+    Chaque période est datée de sa dernière séance, comme une ligne de
+    ``history`` : les vues longues utilisent ces lignes telles quelles.
+    """
+    frame = pd.DataFrame(history)
+    groups = frame.groupby(pd.to_datetime(frame["date"]).dt.to_period(freq), sort=True)
+    last = groups.last()
+    columns = {field: last[field].tolist() for field in HISTORY_FIELDS}
+    multiple = groups["multiple"]
+    columns["multipleOpen"] = multiple.first().tolist()
+    columns["multipleHigh"] = multiple.max().tolist()
+    columns["multipleLow"] = multiple.min().tolist()
+    return columns
+
+
+def rows_to_columns(rows):
+    return {field: [row[field] for row in rows] for field in HISTORY_FIELDS}
+
+
+def columns_to_rows(columns):
+    return [dict(zip(HISTORY_FIELDS, values)) for values in zip(*(columns[f] for f in HISTORY_FIELDS))]
+
+
+def dump_json(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+
+
+def write_hashed(directory: Path, stem: str, payload):
+    body = dump_json(payload)
+    name = f"{stem}.{hashlib.sha256(body.encode()).hexdigest()[:12]}.json"
+    path = directory / name
+    if not path.exists():
+        path.write_text(body, encoding="utf-8")
+    return name
+
+
+def write_shards(directory: Path, manifest, history, aggregates):
+    """Écrit ``history`` en un fichier par année civile plus ``manifest.json``.
+
+    Les noms de fichiers contiennent un hash du contenu : une année close garde
+    le même nom d'une génération à l'autre et reste en cache chez le client,
+    seul le manifeste (et l'année en cours) change. Les séries agrégées sont
+    écrites de la même façon et référencées par ``aggregates``.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    shards = []
+    start = 0
+    for year, days in groupby(history["date"], key=lambda day: day[:4]):
+        end = start + sum(1 for _ in days)
+        name = write_hashed(
+            directory,
+            f"history-{year}",
+            {field: values[start:end] for field, values in history.items()},
+        )
+        shards.append({
+            "year": int(year),
+            "file": name,
+            "first": history["date"][start],
+            "last": history["date"][end - 1],
+            "sessions": end - start,
+        })
+        start = end
+    files = {
+        resolution: write_hashed(directory, f"aggregate-{resolution}", columns)
+        for resolution, columns in aggregates.items()
+    }
+
+    current = {shard["file"] for shard in shards} | set(files.values())
+    for pattern in ("history-*.json", "aggregate-*.json"):
+        for stale in directory.glob(pattern):
+            if stale.name not in current:
+                stale.unlink()
+    manifest = {**manifest, "shards": shards, "aggregates": files}
+    (directory / "manifest.json").write_text(dump_json(manifest), encoding="utf-8")
+    return shards
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Génère data.json pour le dashboard Strategy.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="repartir du data.json existant et ne recalculer que les séances nouvelles "
+        "ou touchées par un point BPS modifié",
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=Path,
+        help="lire cours et KPIs dans ce dossier au lieu de Yahoo Finance / Strategy",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["rows", "columnar"],
+        default="rows",
+        help="history en tableau d'objets (rows) ou en un tableau par champ (columnar)",
+    )
+    parser.add_argument("--output", type=Path, default=OUT)
+    parser.add_argument(
+        "--shards",
+        type=Path,
+        nargs="?",
+        const=SHARDS_DIR,
+        help="écrire aussi history par année avec un manifest.json dans ce dossier "
+        f"(par défaut {SHARDS_DIR.name}/)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    source = FixtureSource(args.fixtures) if args.fixtures else LiveSource()
+
     disclosures = disclosure_rows()
     live_error = None
     try:
-        live = fetch_live_bps()
+        live = source.live_bps()
         disclosures = [x for x in disclosures if x["date"] != live["date"]]
         disclosures.append(live)
     except Exception as exc:
@@ -103,12 +318,24 @@ def main():
 
     disclosures.sort(key=lambda x: x["date"])
 
-    mstr = close_series("MSTR")
-    btc = close_series("BTC-USD")
-    prices = pd.concat([mstr, btc], axis=1).sort_index()
-    prices["BTC-USD"] = prices["BTC-USD"].ffill()
-    prices = prices.dropna(subset=["MSTR", "BTC-USD"]).reset_index()
-    prices.columns = ["date", "mstr", "btc"]
+    previous = load_previous(args.output) if args.incremental else None
+    kept = {field: [] for field in HISTORY_FIELDS}
+    if previous:
+        # Les séances antérieures à la fenêtre re-téléchargée et au premier point
+        # BPS modifié sont reprises telles quelles ; les suivantes sont
+        # re-téléchargées et recalculées. Les cours publiés étant arrondis, les
+        # recalculer ne redonnerait pas exactement les valeurs d'une génération
+        # complète.
+        fetch_start = pd.Timestamp(previous["history"]["date"][-1]) - pd.Timedelta(days=REFRESH_OVERLAP_DAYS)
+        changed = first_changed_disclosure(previous.get("disclosures", []), disclosures)
+        if changed:
+            fetch_start = min(fetch_start, pd.Timestamp(changed))
+        prices = market_prices(source, fetch_start.date().isoformat())
+        cutoff = prices["date"].iloc[0].date().isoformat()
+        end = bisect_left(previous["history"]["date"], cutoff)
+        kept = {field: values[:end] for field, values in previous["history"].items()}
+    else:
+        prices = market_prices(source)
 
     ddf = pd.DataFrame(disclosures)
     ddf["date"] = pd.to_datetime(ddf["date"])
@@ -123,19 +350,14 @@ def main():
     merged["backingShares"] = SATS / merged["bps"]
     merged["multiple"] = merged["backingShares"] / merged["marketShares"]
 
-    history = []
-    for row in merged.itertuples(index=False):
-        history.append({
-            "date": row.date.date().isoformat(),
-            "mstr": round(float(row.mstr), 4),
-            "btc": round(float(row.btc), 2),
-            "bps": round(float(row.bps), 2),
-            "marketShares": round(float(row.marketShares), 4),
-            "backingShares": round(float(row.backingShares), 4),
-            "multiple": round(float(row.multiple), 5),
-        })
+    recomputed = history_columns(merged)
+    history = {field: kept[field] + recomputed[field] for field in HISTORY_FIELDS}
+    sessions = len(history["date"])
 
-    latest = history[-1]
+    latest = {field: values[-1] for field, values in history.items()}
+    aggregates = {
+        resolution: aggregate_columns(history, freq) for resolution, freq in AGGREGATES.items()
+    }
     payload = {
         "generatedAt": datetime.now(timezone.utc).isoformat(),
         "latest": latest,
@@ -149,11 +371,19 @@ def main():
             }
             for x in disclosures
         ],
-        "history": history,
+        "history": history if args.format == "columnar" else columns_to_rows(history),
+        "aggregates": aggregates,
         "warnings": [live_error] if live_error else [],
     }
-    OUT.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
-    print(f"Wrote {OUT}: {len(history)} market sessions, {len(disclosures)} BPS points")
+    args.output.write_text(dump_json(payload), encoding="utf-8")
+    print(
+        f"Wrote {args.output}: {sessions} market sessions ({len(merged)} recomputed), "
+        f"{len(disclosures)} BPS points"
+    )
+    if args.shards:
+        manifest = {key: value for key, value in payload.items() if key not in ("history", "aggregates")}
+        shards = write_shards(args.shards, manifest, history, aggregates)
+        print(f"Wrote {args.shards / 'manifest.json'}: {len(shards)} yearly shards")
 
 
 if __name__ == "__main__":